@@ -1,20 +1,3161 @@
 import tkinter as tk
 from tkinter import messagebox, Text
+import argparse
+import bisect
+import collections
+import concurrent.futures
 import csv
+import difflib
+import glob
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import math
+import lzma
+import mmap
+import multiprocessing
 import os
+import queue
+import random
+import socket
+import sqlite3
 import sys
-from datetime import datetime
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, date
 import re
+import shutil
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image, ImageTk
+try:
+    import numpy as np  # For recomputing response statistics in bulk
+except ImportError:
+    np = None
+try:
+    import cv2  # For playing videos inside the form
+except ImportError:
+    cv2 = None
 import pygame  # For audio playback
 import subprocess  # For video playback
 import platform  # For detecting OS
 import tempfile  # Might be needed for temporary files
 from PyInstaller.utils.hooks import collect_all
 
+# Trailing modifier list on a question or media line, e.g. "What is your age?<number, required>"
+MODIFIER_PATTERN = re.compile(r'\s*<([^<>]+)>\s*$')
+
+# Modifiers understood by the form; "name=value" modifiers are checked by name
+KNOWN_MODIFIERS = {'long', 'integer', 'number', 'text', 'checkmark', 'media', 'required', 'regex', 'range', 'unique',
+                   'lookup'}
+
+# An opening "<" followed by a known modifier but never closed, e.g. "What is your age?<number" or
+# "<number, required"; any other "<" is ordinary question text, like "Rate it 1-10 <scale of pain"
+UNCLOSED_MODIFIER_PATTERN = re.compile(r'<\s*(?:%s)\s*(?:[,=][^<>]*)?$' % '|'.join(sorted(KNOWN_MODIFIERS)),
+                                       re.IGNORECASE)
+
+# Patterns used by the <integer>, <number> and <text> validators, compiled once
+INTEGER_PATTERN = re.compile(r'-?\d+')
+NUMBER_PATTERN = re.compile(r'-?(\d+(\.\d*)?|\.\d+)')
+DIGIT_PATTERN = re.compile(r'\d')
+
+# Bump when the layout of the compiled schema cache or the parsing rules change, so stale caches are reparsed
+SCHEMA_CACHE_VERSION = 4
+
+class QuestionFormatError(Exception):
+    """Raised when the questions file has malformed modifiers; lists every problem with its line and column"""
+    def __init__(self, file_name, problems):
+        self.file_name = file_name
+        self.problems = problems  # (line number, column, message)
+        shown = [f"Line {line}, column {column}: {message}" for line, column, message in problems[:10]]
+        if len(problems) > 10:
+            shown.append(f"...and {len(problems) - 10} more")
+        super().__init__(f"{file_name} has formatting problems:\n\n" + "\n".join(shown))
+
+def split_modifiers(modifier_text):
+    """Split the inside of <...> into (modifier, offset) pairs
+    
+    Names are lower-cased but values are kept as written. Everything after "regex="
+    belongs to the pattern, so a regex may contain commas as long as it comes last.
+    """
+    entries = []
+    offset = 0
+    while True:
+        comma = modifier_text.find(',', offset)
+        raw = modifier_text[offset:] if comma == -1 else modifier_text[offset:comma]
+        name, equals, value = raw.strip().partition('=')
+        name = name.strip().lower()
+        if name == 'regex':
+            value = modifier_text[offset:].strip().partition('=')[2]
+            comma = -1
+        entries.append((f"{name}={value.strip()}" if equals else name,
+                        offset + len(raw) - len(raw.lstrip())))
+        if comma == -1:
+            return entries
+        offset = comma + 1
+
+def parse_range(value):
+    """Parse a <range=low..high> value; either end may be left out. Raises ValueError"""
+    low, separator, high = value.partition('..')
+    if not separator:
+        raise ValueError(f"range '{value}' should look like 1..10")
+    try:
+        low = float(low) if low.strip() else None
+        high = float(high) if high.strip() else None
+    except ValueError:
+        raise ValueError(f"range '{value}' should only contain numbers, like 1..10")
+    if low is None and high is None:
+        raise ValueError(f"range '{value}' needs at least one end, like 1..10 or 1..")
+    if low is not None and high is not None and low > high:
+        raise ValueError(f"range '{value}' has its low end above its high end")
+    return low, high
+
+def lookup_source(modifiers):
+    """The reference list file named by a <lookup=file.csv> modifier, or None"""
+    for modifier in modifiers:
+        if modifier.startswith('lookup='):
+            return modifier[len('lookup='):]
+    return None
+
+def schema_id(questions):
+    """Short stable ID for a list of questions, so data can refer to it instead of repeating it"""
+    return hashlib.sha1(json.dumps(questions).encode('utf-8')).hexdigest()[:12]
+
+class PooledRow:
+    """A question row (label plus input) placed on the form canvas and reused across questions"""
+    def __init__(self, app, kind):
+        self.app = app
+        self.kind = kind
+        self.question_index = None
+        self.var = None
+        self.widget = None
+        self.frame = tk.Frame(app.canvas)
+        self.frame.columnconfigure(0, weight=1)
+        
+        if kind != 'media':
+            self.label = tk.Label(self.frame, anchor="w", justify="left")
+            self.label.grid(row=0, column=0, sticky="ew", pady=(10, 0))
+            
+            entry_frame = tk.Frame(self.frame)
+            entry_frame.grid(row=1, column=0, sticky="ew", pady=(5, 10))
+            entry_frame.columnconfigure(0, weight=1)
+            self.widget, self.var = app._create_input_widget(entry_frame, [kind])
+            if kind == 'entry':
+                LookupDropdown(app, self.widget, self._lookup)
+        
+        self.window_id = app.canvas.create_window((0, 0), window=self.frame,
+                                                  anchor="nw", state="hidden")
+    
+    def load(self, question_index, question, answer):
+        """Point this row at a question and show its saved answer"""
+        self.question_index = question_index
+        self.label.config(text=question)
+        if self.kind == 'checkmark':
+            self.var.set(answer)
+        elif self.kind == 'long':
+            self.widget.delete("1.0", tk.END)
+            self.widget.insert("1.0", answer)
+        else:
+            self.widget.delete(0, tk.END)
+            self.widget.insert(0, answer)
+    
+    def _lookup(self):
+        """The LookupIndex for the question this row shows, if it is a <lookup=...> question"""
+        if self.question_index is None:
+            return None
+        return self.app.lookups.get(lookup_source(self.app.question_modifiers[self.question_index]))
+    
+    def read(self):
+        """Return the answer currently typed into this row"""
+        if self.kind == 'checkmark':
+            return self.var.get()
+        elif self.kind == 'long':
+            return self.widget.get("1.0", "end-1c")
+        return self.widget.get()
+
+class ThumbnailCache:
+    """On-disk cache of shrunk images keyed on source path, mtime, size and target box, evicted LRU"""
+    def __init__(self, folder, max_bytes=64 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+        
+        # Cache file -> (last use, size); a hit refreshes the file mtime so LRU survives restarts
+        self.entries = {}
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith(('.ppm', '.png')):
+                stat = entry.stat()
+                self.entries[entry.path] = (stat.st_mtime, stat.st_size)
+        self.total_bytes = sum(size for _, size in self.entries.values())
+    
+    def _key(self, path, max_size, record=None):
+        """Cache file stem for a source image; any edit to the source changes the key
+        
+        record is the image's MediaManifest entry, which saves a stat of the file.
+        """
+        if record is None:
+            stat = os.stat(path)
+            record = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+        raw = f"{os.path.abspath(path)}|{record['mtime_ns']}|{record['size']}|{max_size[0]}x{max_size[1]}"
+        return os.path.join(self.folder, hashlib.sha1(raw.encode('utf-8')).hexdigest())
+    
+    def load(self, path, max_size, record=None):
+        """Return the cached thumbnail for path, or None on a miss"""
+        stem = self._key(path, max_size, record)
+        for cache_file in (stem + '.ppm', stem + '.png'):
+            with self.lock:
+                if cache_file not in self.entries:
+                    continue
+                now = datetime.now().timestamp()
+                self.entries[cache_file] = (now, self.entries[cache_file][1])
+            try:
+                os.utime(cache_file, (now, now))
+                with Image.open(cache_file) as img:
+                    img.load()
+                return img
+            except Exception:
+                self._forget(cache_file)
+        return None
+    
+    def store(self, path, max_size, img, record=None):
+        """Save a thumbnail; raw PPM decodes fastest, PNG (fast compression) keeps transparency"""
+        stem = self._key(path, max_size, record)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            cache_file, fmt, options = stem + '.png', 'PNG', {'compress_level': 1}
+            img = img if img.mode != 'P' else img.convert('RGBA')
+        else:
+            cache_file, fmt, options = stem + '.ppm', 'PPM', {}
+            img = img if img.mode in ('RGB', 'L') else img.convert('RGB')
+        
+        temp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+        try:
+            img.save(temp_file, fmt, **options)
+            os.replace(temp_file, cache_file)  # Readers never see a half-written thumbnail
+        except Exception as e:
+            print(f"Could not cache thumbnail for {path}: {str(e)}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return
+        
+        size = os.path.getsize(cache_file)
+        with self.lock:
+            _, old_size = self.entries.get(cache_file, (0, 0))
+            self.entries[cache_file] = (datetime.now().timestamp(), size)
+            self.total_bytes += size - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        """Drop least recently used thumbnails until the cache is back under 90% of its limit"""
+        for cache_file, (_, size) in sorted(self.entries.items(), key=lambda item: item[1][0]):
+            if self.total_bytes <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
+            del self.entries[cache_file]
+            self.total_bytes -= size
+    
+    def _forget(self, cache_file):
+        """Remove an unreadable cache file"""
+        with self.lock:
+            _, size = self.entries.pop(cache_file, (0, 0))
+            self.total_bytes -= size
+        try:
+            os.remove(cache_file)
+        except OSError:
+            pass
+
+class ImageLoader:
+    """Decodes and shrinks images on worker threads and hands the results back to the Tk thread"""
+    def __init__(self, root, cache=None, workers=None):
+        self.root = root
+        self.cache = cache  # Optional ThumbnailCache; hits skip the full-size decode
+        self.jobs = queue.PriorityQueue()  # Lowest priority number is decoded first
+        self.results = queue.Queue()
+        self.counter = itertools.count()  # Keeps equal priorities in request order
+        self.pending = 0
+        self.polling = False
+        
+        if workers is None:
+            workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+    
+    def request(self, path, max_size, on_ready, priority=0, record=None):
+        """Queue an image for decoding; on_ready(image, error) is later called on the Tk thread
+        
+        record is the image's MediaManifest entry, passed on to the cache.
+        """
+        self.pending += 1
+        self.jobs.put((priority, next(self.counter), path, max_size, on_ready, record))
+        if not self.polling:
+            self.polling = True
+            self.root.after(30, self._poll)
+    
+    def _work(self):
+        """Worker thread loop: never touches Tk, only PIL"""
+        while True:
+            _, _, path, max_size, on_ready, record = self.jobs.get()
+            try:
+                img = self.cache.load(path, max_size, record) if self.cache else None
+                if img is None:
+                    with Image.open(path) as img:
+                        img.thumbnail(max_size, Image.LANCZOS)
+                    if self.cache:
+                        self.cache.store(path, max_size, img, record)
+                self.results.put((on_ready, img, None))
+            except Exception as e:
+                self.results.put((on_ready, None, e))
+    
+    def _poll(self):
+        """Deliver finished images on the Tk thread, polling again while work is outstanding"""
+        while True:
+            try:
+                on_ready, img, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            try:
+                on_ready(img, error)
+            except Exception as e:
+                print(f"Could not show decoded image: {str(e)}")
+        
+        if self.pending:
+            self.root.after(30, self._poll)
+        else:
+            self.polling = False
+
+class BackgroundWorker:
+    """Runs jobs one at a time, in order, on a worker thread and reports back on the Tk thread"""
+    def __init__(self, root):
+        self.root = root
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.polling = False
+        threading.Thread(target=self._work, daemon=True).start()
+    
+    def run(self, job, on_done):
+        """Queue job(); on_done(result, error) is later called on the Tk thread"""
+        self.pending += 1
+        self.jobs.put((job, on_done))
+        if not self.polling:
+            self.polling = True
+            self.root.after(50, self._poll)
+    
+    def drain(self, timeout=None):
+        """Block until every job queued so far has run (e.g. before closing what they write to)
+        
+        Returns False if timeout ran out first.
+        """
+        done = threading.Event()
+        self.jobs.put((done.set, None))
+        return done.wait(timeout)
+    
+    def _work(self):
+        """Worker thread loop: jobs must not touch Tk"""
+        while True:
+            job, on_done = self.jobs.get()
+            if on_done is None:
+                job()  # A drain() marker
+                continue
+            try:
+                self.results.put((on_done, job(), None))
+            except Exception as e:
+                self.results.put((on_done, None, e))
+    
+    def _poll(self):
+        """Deliver finished jobs on the Tk thread, polling again while work is outstanding"""
+        while True:
+            try:
+                on_done, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            try:
+                on_done(result, error)
+            except Exception as e:
+                print(f"Background job callback failed: {str(e)}")
+        
+        if self.pending:
+            self.root.after(50, self._poll)
+        else:
+            self.polling = False
+
+class CircuitBreaker:
+    """Stops calling a failing server for a cooldown instead of paying a timeout on every attempt
+    
+    closed: calls go through. After failure_threshold failures in a row it opens.
+    open: calls are skipped until the cooldown ends, then one trial call is let through (half_open).
+    half_open: a success closes the breaker again, a failure reopens it for another cooldown.
+    """
+    def __init__(self, failure_threshold=5, cooldown=60, on_change=None):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.on_change = on_change  # Called with (old state, new state) on every transition
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.transitions = []  # Recent (time, old state, new state), for monitoring
+    
+    def allow(self):
+        """Whether a call may be attempted now"""
+        if self.state == 'open' and time.time() - self.opened_at >= self.cooldown:
+            self._change('half_open')
+        return self.state != 'open'
+    
+    def seconds_until_retry(self):
+        """How long until an open breaker lets a trial call through"""
+        return max(0, self.opened_at + self.cooldown - time.time()) if self.state == 'open' else 0
+    
+    def record_success(self):
+        self.failures = 0
+        if self.state != 'closed':
+            self._change('closed')
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.opened_at = time.time()
+            if self.state != 'open':
+                self._change('open')
+    
+    def _change(self, state):
+        old_state, self.state = self.state, state
+        self.transitions = (self.transitions + [(datetime.now(), old_state, state)])[-20:]
+        if self.on_change:
+            self.on_change(old_state, state)
+
+class Outbox:
+    """Durable queue of web submissions, uploaded by a background sender
+    
+    Every web submission is committed to a SQLite file first, so nothing is lost when
+    the network or server is down. The sender posts entries oldest first with an
+    Idempotency-Key header (so a retried post can't create a duplicate), backing off
+    exponentially with jitter while the server keeps failing.
+    
+    With batch_size above 1, up to that many entries (or whatever arrives within
+    batch_window seconds) are sent as one gzip-compressed post instead; see _post_batch.
+    """
+    def __init__(self, path, timeout=(5, 30), max_backoff=600,
+                 batch_size=1, batch_window=0.5, max_batch_bytes=1024 * 1024):
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self.batch_limit = batch_size  # Shrinks while the server refuses whole batches
+        self.batch_window = batch_window
+        self.max_batch_bytes = max_batch_bytes  # Cap on the uncompressed size of one batch
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closing = threading.Event()
+        self.failures = 0  # Consecutive failed posts, drives the backoff
+        self.last_error = ""
+        self.breaker = CircuitBreaker(
+            on_change=lambda old, new: print(f"Upload circuit breaker: {old} -> {new}"))
+        
+        # One long-lived session keeps the connection to the server alive between posts.
+        # Retrying a POST is only safe because every post carries an Idempotency-Key.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2,
+                              max_retries=Retry(total=2, backoff_factor=0.5,
+                                                status_forcelist=(502, 503, 504),
+                                                allowed_methods=frozenset(['POST']),
+                                                raise_on_status=False))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA synchronous=FULL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT UNIQUE NOT NULL,
+            url TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            last_error TEXT NOT NULL DEFAULT '')""")
+        self.connection.commit()
+        self.depth, self.rejected = self._count()
+        self.sender = threading.Thread(target=self._send_loop, daemon=True)
+        self.sender.start()
+    
+    def add(self, url, data):
+        """Durably queue a submission for url and wake the sender"""
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO outbox (idempotency_key, url, payload, created) VALUES (?, ?, ?, ?)",
+                (str(uuid.uuid4()), url, json.dumps(data), datetime.now().isoformat()))
+            self.connection.commit()
+            self.depth += 1
+        self.wake.set()
+    
+    def _count(self):
+        """(pending, rejected) entry counts"""
+        with self.lock:
+            counts = dict(self.connection.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+        return counts.get('pending', 0), counts.get('rejected', 0)
+    
+    def _next_entries(self):
+        """Oldest pending entries for one URL, within the batch count and size limits"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id, idempotency_key, url, payload FROM outbox "
+                "WHERE status = 'pending' ORDER BY id LIMIT ?", (self.batch_limit,)).fetchall()
+        entries = []
+        size = 0
+        for entry_id, key, url, payload in rows:
+            size += len(payload)
+            if entries and (url != entries[0][2] or size > self.max_batch_bytes):
+                break
+            entries.append((entry_id, key, url, payload))
+        return entries
+    
+    def _send_loop(self):
+        """Sender thread: upload pending entries oldest first, backing off while posts fail"""
+        while not self.closing.is_set():
+            entries = self._next_entries()
+            if not entries:
+                self.wake.wait()
+                self.wake.clear()
+                if self.batch_size > 1:
+                    # Let a burst of submissions build up into one batch
+                    self.closing.wait(self.batch_window)
+                continue
+            
+            if not self.breaker.allow():
+                # The server has been failing; wait out the cooldown instead of paying timeouts
+                self.closing.wait(self.breaker.seconds_until_retry())
+                continue
+            
+            url = entries[0][2]
+            if self.batch_size > 1:
+                results = self._post_batch(url, entries)
+            else:
+                entry_id, key, _, payload = entries[0]
+                results = {entry_id: self._post(url, payload, key)}
+            
+            with self.lock:
+                for entry_id, (status, error) in results.items():
+                    if status == 'sent':
+                        self.connection.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+                        self.depth -= 1
+                    else:
+                        self.connection.execute(
+                            "UPDATE outbox SET attempts = attempts + 1, status = ?, last_error = ? WHERE id = ?",
+                            ('rejected' if status == 'rejected' else 'pending', error, entry_id))
+                        if status == 'rejected':
+                            self.depth -= 1
+                            self.rejected += 1
+                self.connection.commit()
+            
+            errors = [error for status, error in results.values() if status == 'retry']
+            if errors and len(errors) == len(results):
+                self.breaker.record_failure()
+                self.failures += 1
+                self.last_error = errors[0]
+                # Exponential backoff with jitter so a fleet of kiosks doesn't retry in lockstep
+                delay = min(self.max_backoff, 2 ** self.failures)
+                self.closing.wait(delay * random.uniform(0.5, 1.0))
+            else:
+                self.breaker.record_success()
+                self.failures = 0
+                self.last_error = errors[0] if errors else ""
+    
+    def close(self, timeout=5):
+        """Stop the sender, letting a post in flight finish, and close the outbox file
+        
+        Entries not yet sent stay in the file and are sent the next time the form opens.
+        Returns False (leaving the file open) if the sender is still busy after timeout.
+        """
+        self.closing.set()
+        self.wake.set()
+        self.sender.join(timeout)
+        if self.sender.is_alive():
+            return False
+        with self.lock:
+            self.connection.close()
+        self.session.close()
+        return True
+    
+    def _post_batch(self, url, entries):
+        """Post several entries as one gzip-compressed JSON body, returning {entry id: (status, error)}
+        
+        The body is {"schemas": {schema id: questions}, "submissions": [{"id", "schema_id",
+        "responses", "timestamp"}, ...]}, so each question list is sent once per batch rather
+        than once per submission. The server may answer with {"accepted": [...], "rejected": [...]}
+        listing submission ids; ids it leaves out are retried. If it refuses a whole batch,
+        the batch is halved until the offending submission is sent (and rejected) on its own.
+        """
+        schemas = {}
+        submissions = []
+        ids = {}
+        for entry_id, key, _, payload in entries:
+            data = json.loads(payload)
+            questions_id = schema_id(data['questions'])
+            schemas.setdefault(questions_id, data['questions'])
+            submissions.append({"id": key, "schema_id": questions_id,
+                                "responses": data['responses'], "timestamp": data['timestamp']})
+            ids[key] = entry_id
+        body = gzip.compress(json.dumps({"schemas": schemas, "submissions": submissions}).encode('utf-8'))
+        batch_key = hashlib.sha1(" ".join(ids).encode('utf-8')).hexdigest()
+        
+        try:
+            response = self.session.post(url, data=body, timeout=self.timeout,
+                                     headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip',
+                                              'Idempotency-Key': batch_key})
+        except requests.RequestException as e:
+            return {entry_id: ('retry', str(e)) for entry_id in ids.values()}
+        
+        error = f"Remote server returned status code {response.status_code}"
+        if 200 <= response.status_code < 300:
+            self.batch_limit = self.batch_size
+            try:
+                outcome = response.json()
+                accepted, rejected = set(outcome['accepted']), set(outcome.get('rejected', []))
+            except (ValueError, KeyError, TypeError):
+                return {entry_id: ('sent', "") for entry_id in ids.values()}
+            return {entry_id: ('sent', "") if key in accepted else
+                              ('rejected', "Rejected by server") if key in rejected else
+                              ('retry', "Not accepted by server")
+                    for key, entry_id in ids.items()}
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            if len(entries) == 1:
+                return {entries[0][0]: ('rejected', error)}
+            # Too large, or one submission spoils the batch: retry with smaller batches
+            self.batch_limit = max(1, len(entries) // 2)
+        return {entry_id: ('retry', error) for entry_id in ids.values()}
+    
+    def _post(self, url, payload, key):
+        """Post one entry, returning ('sent' | 'retry' | 'rejected', error message)"""
+        try:
+            response = self.session.post(url, data=payload, timeout=self.timeout,
+                                     headers={'Content-Type': 'application/json', 'Idempotency-Key': key})
+        except requests.RequestException as e:
+            return 'retry', str(e)
+        if 200 <= response.status_code < 300:
+            return 'sent', ""
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            # The server refused this submission itself; keep it on disk but stop retrying it
+            return 'rejected', f"Remote server returned status code {response.status_code}"
+        return 'retry', f"Remote server returned status code {response.status_code}"
+
+class SchemaRegistry:
+    """Append-only file (Schemas.jsonl) of every question list responses were saved with
+    
+    Response rows only carry the schema_id of their question list, so editing
+    Questions.txt adds one line here instead of rewriting old responses.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.schemas = {}  # Schema ID -> questions, in the order they were first seen
+        self.ids = {}  # Tuple of questions -> schema ID, so appends don't rehash the question list
+        self.reload()
+    
+    def reload(self):
+        """Pick up question lists registered since (e.g. by other kiosks sharing the directory)"""
+        try:
+            with open(self.path, 'r') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        self.schemas.setdefault(entry['id'], entry['questions'])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Torn or hand-edited line
+        except FileNotFoundError:
+            pass
+    
+    def register(self, questions):
+        """Return the ID of a question list, recording it first if it is new"""
+        key = tuple(questions)
+        questions_id = self.ids.get(key)
+        if questions_id is None:
+            questions_id = self.ids[key] = schema_id(questions)
+        with self.lock:
+            if questions_id not in self.schemas:
+                line = json.dumps({"id": questions_id, "questions": questions}) + "\n"
+                # A single O_APPEND write, so writers sharing the file never interleave lines
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+                try:
+                    os.write(fd, line.encode('utf-8'))
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                self.schemas[questions_id] = questions
+        return questions_id
+
+class ColumnMap:
+    """Lays answers from any registered question list out on one combined set of columns
+    
+    Columns are every distinct question in the order first seen; a question asked
+    twice in one list gets a column per occurrence.
+    """
+    def __init__(self, schemas):
+        self.columns = []
+        self.positions = {}  # Schema ID -> column index of each of its answers
+        column_of = {}
+        for questions_id, questions in schemas.items():
+            seen = {}
+            positions = []
+            for question in questions:
+                seen[question] = seen.get(question, 0) + 1
+                key = (question, seen[question])
+                if key not in column_of:
+                    column_of[key] = len(self.columns)
+                    self.columns.append(question)
+                positions.append(column_of[key])
+            self.positions[questions_id] = positions
+    
+    def row(self, questions_id, answers):
+        """Answers placed under their questions' columns (blank where a question wasn't asked)"""
+        positions = self.positions.get(questions_id) or range(len(answers))
+        row = [""] * len(self.columns)
+        for position, answer in zip(positions, answers):
+            if position < len(row):
+                row[position] = answer
+        return row
+
+def response_row_decoder(header, registry):
+    """A function turning one row of a responses CSV with this header into (schema ID, answers, timestamp)
+    
+    Rows are laid out as answers, Timestamp, Schema and (usually) Checksum. Files
+    written before the Schema column existed have plain rows matching their header,
+    possibly followed by schema-tagged rows appended after a form edit. The decoder
+    returns None for blank rows.
+    """
+    has_checksum = bool(header) and header[-1] == CsvResponseStore.CHECKSUM_COLUMN
+    if has_checksum:
+        header = header[:-1]
+    has_schema = bool(header) and header[-1] == CsvResponseStore.SCHEMA_COLUMN
+    if has_schema:
+        header = header[:-1]
+    header_id = schema_id(header[:-1])
+    registry.schemas.setdefault(header_id, header[:-1])
+    
+    def decode(row):
+        if has_checksum:
+            row = row[:-1]
+        if not row:
+            return None
+        tagged = row[-1] in registry.schemas and len(row) == len(registry.schemas[row[-1]]) + 2
+        if has_schema or tagged:
+            questions_id, row = row[-1], row[:-1]
+        else:
+            questions_id = header_id
+        return questions_id, row[:-1], row[-1] if row else ""
+    return decode
+
+def read_response_rows(file, registry):
+    """Yield (schema ID, answers, timestamp) for every row of a responses CSV"""
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if not header:
+        return
+    decode = response_row_decoder(header, registry)
+    for row in reader:
+        decoded = decode(row)
+        if decoded is not None:
+            yield decoded
+
+def csv_records(file):
+    """Yield (byte offset, bytes) of each record in a binary CSV file, header included
+    
+    A record ends at the first line break outside quotes, i.e. once the record
+    holds an even number of quote characters, so answers with line breaks are fine.
+    """
+    offset = file.tell()
+    record = b''
+    for line in iter(file.readline, b''):
+        record += line
+        if record.count(b'"') % 2 == 0:
+            yield offset, record
+            offset += len(record)
+            record = b''
+
+class TimestampIndex:
+    """Sparse sidecar index (<file>.idx) from row timestamps to byte offsets in a responses CSV
+    
+    Every `every`-th row's timestamp and offset is appended as one "timestamp<TAB>offset"
+    line. Rows are written in time order, so a binary search over the index lands
+    within `every` rows of any timestamp. The index is only a hint: entries past the
+    end of the file are ignored, and a missing index is rebuilt in one streaming pass.
+    """
+    def __init__(self, csv_path, every=1000):
+        self.csv_path = csv_path
+        self.path = csv_path + ".idx"
+        self.every = every
+        self.file = None
+        self.rows_since_entry = every  # So the first row always gets an entry
+    
+    def load(self):
+        """The (timestamps, offsets) of the index entries, rebuilding the index if it is missing"""
+        if not os.path.exists(self.path) and os.path.exists(self.csv_path):
+            self.rebuild()
+        csv_size = os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0
+        timestamps, offsets = [], []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    timestamp, _, offset = line.rstrip('\n').rpartition('\t')
+                    if timestamp and offset.isdigit() and int(offset) < csv_size:
+                        timestamps.append(timestamp)
+                        offsets.append(int(offset))
+        except FileNotFoundError:
+            pass
+        return timestamps, offsets
+    
+    def rebuild(self):
+        """Index an existing file from scratch in one pass over it"""
+        self.close()
+        self.rows_since_entry = self.every
+        registry = SchemaRegistry(os.path.join(os.path.dirname(os.path.abspath(self.csv_path)), "Schemas.jsonl"))
+        with open(self.csv_path, 'rb') as csv_file, open(self.path + ".tmp", 'w', encoding='utf-8') as file:
+            records = csv_records(csv_file)
+            header = next(records, None)
+            decode = response_row_decoder(next(csv.reader([header[1].decode('utf-8')]), []) if header else [],
+                                          registry)
+            for offset, record in records:
+                if self.rows_since_entry >= self.every:
+                    decoded = decode(next(csv.reader([record.decode('utf-8', 'replace')]), []))
+                    if decoded is None:
+                        continue
+                    file.write(f"{decoded[2]}\t{offset}\n")
+                    self.rows_since_entry = 0
+                self.rows_since_entry += 1
+        os.replace(self.path + ".tmp", self.path)
+    
+    def add_row(self, timestamp, offset):
+        """Note a row about to be written at offset (only every `every`-th row is recorded)"""
+        if self.rows_since_entry >= self.every:
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(f"{timestamp}\t{offset}\n")
+            self.file.flush()
+            self.rows_since_entry = 0
+        self.rows_since_entry += 1
+    
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.rows_since_entry = self.every
+    
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def in_time_range(timestamp, start, end):
+    """Whether a stored timestamp falls within start..end, where end may be a prefix like 2024-05-01"""
+    return (start is None or timestamp >= start) and (end is None or timestamp[:len(end)] <= end)
+
+def query_indexed_file(csv_path, registry, start=None, end=None, index=None):
+    """Yield (schema ID, answers, timestamp) for the rows of a responses CSV within start..end
+    
+    Binary-searches the TimestampIndex for the first candidate row and streams from
+    there through mmap, stopping at the first row after end.
+    """
+    index = index or TimestampIndex(csv_path)
+    timestamps, offsets = index.load()
+    with open(csv_path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            header_line = view.readline()
+            decode = response_row_decoder(next(csv.reader([header_line.decode('utf-8')]), []), registry)
+            if start is not None:
+                # Entries before position share no rows with the range; rows equal to start may
+                # sit just before the first entry >= start, so begin at the entry before it
+                position = bisect.bisect_left(timestamps, start)
+                if position > 0:
+                    view.seek(offsets[position - 1])
+            lines = (line.decode('utf-8') for line in iter(view.readline, b''))
+            for row in csv.reader(lines):
+                decoded = decode(row)
+                if decoded is None:
+                    continue
+                timestamp = decoded[2]
+                if end is not None and timestamp[:len(end)] > end:
+                    return
+                if in_time_range(timestamp, start, end):
+                    yield decoded
+
+def query_responses(csv_path, start=None, end=None, archive=None):
+    """Yield (schema ID, answers, timestamp) for every response within start..end, oldest first
+    
+    Archived segments outside the range are skipped using the manifest; the live
+    file is searched through its timestamp index.
+    """
+    archive = archive or ResponseArchive(csv_path)
+    for path in archive.files(start, end):
+        if path == archive.path:
+            yield from query_indexed_file(path, archive.registry, start, end)
+            continue
+        with open_response_file(path) as file:
+            for decoded in read_response_rows(file, archive.registry):
+                if end is not None and decoded[2][:len(end)] > end:
+                    break
+                if in_time_range(decoded[2], start, end):
+                    yield decoded
+
+def open_response_file(path, binary=False):
+    """Open a responses CSV for reading, whether plain or a compressed archive segment"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb') if binary else gzip.open(path, 'rt', newline='')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rb') if binary else lzma.open(path, 'rt', newline='')
+    return open(path, 'rb') if binary else open(path, 'r', newline='')
+
+class ResponseArchive:
+    """The closed segments of a rotated responses file, compressed in the background
+    
+    Responses.csv rotates to Responses.000001.csv, Responses.000002.csv, ... which a
+    worker thread compresses to .gz or .xz. Responses.manifest.json lists each
+    compressed segment with its row count and first/last timestamps, so readers
+    after a time range can skip whole segments without opening them.
+    """
+    EXTENSIONS = {"gzip": ".gz", "lzma": ".xz"}
+    
+    def __init__(self, path, registry=None, compression="gzip"):
+        if compression not in self.EXTENSIONS:
+            raise ValueError(f"Unknown compression {compression!r}; use 'gzip' or 'lzma'")
+        self.path = path
+        self.stem, self.extension = os.path.splitext(path)
+        self.manifest_path = self.stem + ".manifest.json"
+        self.registry = registry or SchemaRegistry(
+            os.path.join(os.path.dirname(os.path.abspath(path)), "Schemas.jsonl"))
+        self.compression = compression
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.thread = None
+    
+    def segments(self):
+        """Manifest entries of the compressed segments, oldest first"""
+        try:
+            with open(self.manifest_path, 'r') as file:
+                return json.load(file)["segments"]
+        except FileNotFoundError:
+            return []
+        except (ValueError, KeyError, TypeError):
+            print(f"Ignoring unreadable manifest {self.manifest_path}")
+            return []
+    
+    def _rotated(self):
+        """Every rotated segment still in its uncompressed form, oldest first"""
+        pattern = glob.escape(self.stem) + ".[0-9]*" + glob.escape(self.extension)
+        return sorted(glob.glob(pattern))
+    
+    def _archived_name(self, segment_path, archived):
+        """File name of the segment's compressed copy if the manifest lists one, else None"""
+        for extension in self.EXTENSIONS.values():
+            if os.path.basename(segment_path) + extension in archived:
+                return os.path.basename(segment_path) + extension
+        return None
+    
+    def snapshot(self):
+        """(manifest entries, segments not yet compressed), each oldest first, with no segment in both
+        
+        A compressed segment is listed in the manifest before its .csv is removed, so for
+        a moment (or for good, after a crash) both exist; the .csv is then left out. The
+        directory is listed before the manifest is read, so a segment archived in
+        between is found in the manifest rather than missed.
+        """
+        rotated = self._rotated()
+        segments = self.segments()
+        archived = {entry["file"] for entry in segments}
+        return segments, [segment for segment in rotated if self._archived_name(segment, archived) is None]
+    
+    def pending_segments(self):
+        """Rotated segments that haven't been compressed yet, oldest first"""
+        return self.snapshot()[1]
+    
+    def _number(self, segment_path):
+        name = os.path.basename(segment_path)[len(os.path.basename(self.stem)) + 1:]
+        return int(name.split('.')[0])
+    
+    def next_segment_path(self):
+        numbers = [entry["number"] for entry in self.segments()]
+        numbers += [self._number(segment) for segment in self._rotated()]
+        return f"{self.stem}.{max(numbers, default=0) + 1:06d}{self.extension}"
+    
+    def files(self, start=None, end=None):
+        """Every file holding responses, oldest first, skipping segments entirely outside start..end
+        
+        start and end are timestamps as stored in the rows ("YYYY-MM-DD HH:MM:SS").
+        """
+        folder = os.path.dirname(self.path)
+        segments, pending = self.snapshot()
+        files = []
+        for entry in segments:
+            if start is not None and entry["last"] is not None and entry["last"] < start:
+                continue
+            if end is not None and entry["first"] is not None and entry["first"] > end:
+                continue
+            files.append(os.path.join(folder, entry["file"]))
+        files += pending
+        if os.path.exists(self.path):
+            files.append(self.path)
+        return files
+    
+    def recover(self):
+        """Queue segments left uncompressed by the last shutdown, and remove ones already archived"""
+        folder = os.path.dirname(self.path)
+        archived = {entry["file"] for entry in self.segments()}
+        for segment in self._rotated():
+            name = self._archived_name(segment, archived)
+            if name is not None and os.path.exists(os.path.join(folder, name)):
+                os.remove(segment)  # Shut down between writing the manifest and removing the .csv
+            else:
+                self.compress(segment)
+    
+    def compress(self, segment_path):
+        """Compress a closed segment on the worker thread"""
+        with self.lock:
+            self.jobs.put(segment_path)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._compress_loop, daemon=True)
+                self.thread.start()
+    
+    def _compress_loop(self):
+        while True:
+            segment_path = self.jobs.get()
+            try:
+                self._compress(segment_path)
+            except (OSError, csv.Error) as e:
+                print(f"Could not archive {segment_path}: {e}")
+    
+    def _compress(self, segment_path):
+        if not os.path.exists(segment_path):
+            return  # Already archived (queued twice)
+        rows = 0
+        first = last = None
+        with open(segment_path, 'r', newline='') as file:
+            for _, _, timestamp in read_response_rows(file, self.registry):
+                rows += 1
+                first = timestamp if first is None else first
+                last = timestamp
+        
+        target = segment_path + self.EXTENSIONS[self.compression]
+        opener = gzip.open if self.compression == "gzip" else lzma.open
+        with open(segment_path, 'rb') as source, open(target + ".tmp", 'wb') as raw:
+            with opener(raw, 'wb') as compressed:
+                shutil.copyfileobj(source, compressed, 1024 * 1024)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(target + ".tmp", target)
+        
+        segments = [entry for entry in self.segments() if entry["file"] != os.path.basename(target)]
+        segments.append({"file": os.path.basename(target), "number": self._number(segment_path),
+                         "inode": os.stat(segment_path).st_ino, "rows": rows, "first": first, "last": last,
+                         "bytes": os.path.getsize(segment_path), "compressed_bytes": os.path.getsize(target)})
+        segments.sort(key=lambda entry: entry["number"])
+        with open(self.manifest_path + ".tmp", 'w') as file:
+            json.dump({"segments": segments}, file, indent=1)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        os.remove(segment_path)
+
+def tail_response_rows(csv_path, offset, registry):
+    """Yield (end offset, (schema ID, answers, timestamp)) for each complete row from offset on
+    
+    A row still being written (no final line break yet) is left for the next call.
+    Offsets into compressed segments count uncompressed bytes.
+    """
+    with open_response_file(csv_path, binary=True) as file:
+        header_line = file.readline()
+        decode = response_row_decoder(next(csv.reader([header_line.decode('utf-8')]), []), registry)
+        file.seek(max(offset, len(header_line)))
+        for start, record in csv_records(file):
+            if not record.endswith(b'\n'):
+                return
+            decoded = decode(next(csv.reader([record.decode('utf-8', 'replace')]), []))
+            if decoded is not None:
+                yield start + len(record), decoded
+
+class CsvResponseStore:
+    """Append-only responses CSV with group commit, per-row checksums and torn-row repair
+    
+    The file stays open for appending. Each row is flushed to the OS as it is written,
+    and fsync'd once commit_rows rows are waiting or commit_interval seconds have passed,
+    so commit_rows=1 trades throughput for syncing every row. New files get a trailing
+    "Checksum" column holding the CRC32 of the rest of the row; on startup a torn last
+    row (e.g. from a power cut mid-write) is moved to a .torn file and cut off.
+    
+    Every row also carries the schema_id of the questions it answers (the "Schema"
+    column, registered in Schemas.jsonl next to the file), so after Questions.txt
+    changes, new rows are simply tagged with the new ID; read them with read_response_rows.
+    
+    With rotate_bytes and/or rotate_daily set, the file is moved into a new archive
+    segment (see ResponseArchive) once it reaches rotate_bytes or a row arrives on a
+    later calendar day than the last one, and a fresh file is started.
+    """
+    CHECKSUM_COLUMN = "Checksum"
+    SCHEMA_COLUMN = "Schema"
+    ROW_END = re.compile(rb',[0-9a-f]{8}\r\n')  # How every checksummed row ends
+    
+    def __init__(self, path, commit_rows=10, commit_interval=1.0, rotate_bytes=0, rotate_daily=False,
+                 compression="gzip"):
+        self.path = path
+        self.registry = SchemaRegistry(os.path.join(os.path.dirname(os.path.abspath(path)), "Schemas.jsonl"))
+        self.commit_rows = commit_rows
+        self.commit_interval = commit_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+        self.archive = None
+        if rotate_bytes or rotate_daily:
+            self.archive = ResponseArchive(path, self.registry, compression)
+            self.archive.recover()
+        self.index = TimestampIndex(path)
+        self.lock = threading.Lock()
+        self.file = None
+        self.size = 0
+        self.last_day = None  # Calendar day of the newest row in the file
+        self.checksums = True
+        self.unsynced = 0
+        self.sync_timer = None
+        self.index_missing = False  # Set when the file has rows but no index yet; see ensure_index()
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            self._open_existing()
+            self.last_day = date.fromtimestamp(os.path.getmtime(self.path))
+            if not os.path.exists(self.index.path):
+                self.index_missing = True
+            else:
+                self.index.rows_since_entry = 0  # Rows since its last entry aren't counted; it's only a hint
+    
+    @staticmethod
+    def encode_row(row):
+        """The CSV text for one row, exactly as csv.writer writes it"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(row)
+        return buffer.getvalue()
+    
+    @classmethod
+    def checksum(cls, row):
+        return f"{zlib.crc32(cls.encode_row(row).encode('utf-8')):08x}"
+    
+    def _open_existing(self):
+        """Check the tail of an existing file, repair a torn last row and keep it open for appending"""
+        with open(self.path, 'r', newline='') as file:
+            header = next(csv.reader(file), [])
+        self.checksums = bool(header) and header[-1] == self.CHECKSUM_COLUMN
+        
+        with open(self.path, 'rb') as file:
+            file_size = file.seek(0, os.SEEK_END)
+            tail_start = max(0, file_size - 1024 * 1024)
+            file.seek(tail_start)
+            tail = file.read()
+        
+        good_end = self._last_good_end(tail)
+        if good_end is not None and tail_start + good_end < file_size:
+            torn_file = f"{self.path}.torn-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            with open(torn_file, 'wb') as file:
+                file.write(tail[good_end:])
+            with open(self.path, 'r+b') as file:
+                file.truncate(tail_start + good_end)
+                os.fsync(file.fileno())
+            print(f"Repaired a torn last row in {self.path}; the partial row was saved to {torn_file}")
+        
+        self.file = open(self.path, 'a', newline='')
+        self.size = os.fstat(self.file.fileno()).st_size
+    
+    def _last_good_end(self, tail):
+        """Offset in tail just after the last complete row, or None if nothing needs cutting"""
+        if not self.checksums:
+            # Without checksums only a missing final line break shows a torn row
+            if tail.endswith(b'\n') or b'\n' not in tail:
+                return None
+            return tail.rfind(b'\n') + 1
+        
+        # Rows start right after the header or after the previous row's checksum
+        header = self.CHECKSUM_COLUMN.encode('utf-8') + b'\r\n'
+        header_end = tail.find(header) + len(header) if header in tail else None
+        ends = [match.end() for match in self.ROW_END.finditer(tail)]
+        boundaries = sorted(ends + ([header_end] if header_end is not None else []))
+        
+        for end in reversed(ends):
+            earlier = [boundary for boundary in boundaries if boundary < end]
+            if not earlier:
+                return end  # The row began before the part we read; trust its ending
+            try:
+                fields = next(csv.reader(io.StringIO(tail[earlier[-1]:end].decode('utf-8'), newline='')))
+            except (StopIteration, UnicodeDecodeError, csv.Error):
+                continue
+            if fields and self.checksum(fields[:-1]) == fields[-1]:
+                return end
+        return header_end
+    
+    def append(self, header, row):
+        """Append one row, writing the header first if the file is new
+        
+        Returns the file's (inode, size) just after the row, so readers can tell how
+        far into which file they have got.
+        """
+        with self.lock:
+            if self.file is not None and self._should_rotate():
+                self._rotate()
+            if self.file is None:
+                self._create(header)
+            self._ensure_index()
+            
+            self.index.add_row(row[-1], self.size)
+            row = row + [self.registry.register(header[:-1])]
+            line = self.encode_row(row + [self.checksum(row)] if self.checksums else row)
+            self.file.write(line)  # One write per row, so a crash can only tear the last one
+            self.file.flush()
+            self.size = os.fstat(self.file.fileno()).st_size
+            self.unsynced += 1
+            self.last_day = date.today()
+            
+            if self.unsynced >= self.commit_rows:
+                self._sync()
+            elif self.sync_timer is None:
+                self.sync_timer = threading.Timer(self.commit_interval, self.sync)
+                self.sync_timer.daemon = True
+                self.sync_timer.start()
+            return os.fstat(self.file.fileno()).st_ino, self.size
+    
+    def ensure_index(self):
+        """Build the timestamp index of an existing file that has none
+        
+        That reads the whole file, so it is left out of __init__ (which runs on the
+        Tk thread) and done here on a worker, or else before the next append.
+        """
+        with self.lock:
+            self._ensure_index()
+    
+    def _ensure_index(self):
+        if self.index_missing:
+            self.index_missing = False
+            if self.file is not None:
+                self.file.flush()
+            self.index.rebuild()
+    
+    def _should_rotate(self):
+        if self.rotate_daily and self.last_day is not None and date.today() != self.last_day:
+            return True
+        return bool(self.rotate_bytes) and self.size >= self.rotate_bytes
+    
+    def _rotate(self):
+        """Close the file, move it to the next archive segment and queue it for compression"""
+        self._sync()
+        self.file.close()
+        self.file = None
+        self.index.remove()  # Segments are compressed, so offsets into them mean nothing
+        segment_path = self.archive.next_segment_path()
+        os.replace(self.path, segment_path)
+        self.archive.compress(segment_path)
+    
+    def _create(self, header):
+        """Create the file with its header in one step and open it for appending
+        
+        O_EXCL means only one writer can ever create it; if another got there first
+        its file is checked and appended to as usual.
+        """
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            if os.path.getsize(self.path):
+                self._open_existing()
+                return
+            # An empty file (like the one shipped in Change_Form) still needs its header
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self.index.remove()  # Left over from an older file of the same name
+        self.index_missing = False
+        with os.fdopen(fd, 'w', newline='') as file:
+            file.write(self.encode_row(header + [self.SCHEMA_COLUMN, self.CHECKSUM_COLUMN]))
+            file.flush()
+            os.fsync(file.fileno())
+        self.checksums = True
+        self.file = open(self.path, 'a', newline='')
+        self.size = os.fstat(self.file.fileno()).st_size
+    
+    def sync(self):
+        """Force every written row to disk"""
+        with self.lock:
+            self._sync()
+    
+    def _sync(self):
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+    
+    def close(self):
+        with self.lock:
+            self._sync()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.index.close()
+
+def merge_response_files(paths, output, registry):
+    """Merge response CSVs into one, ordered by timestamp, holding only one row per file in memory
+    
+    Each file must already be in time order (true of every shard, which is only appended to).
+    Rows from different question lists are mapped onto the combined columns of every
+    list in the registry. Returns the row count.
+    """
+    files = [open(path, 'r', newline='') for path in paths]
+    try:
+        readers = [read_response_rows(file, registry) for file in files]
+        # Prime each reader past its header so every schema is known before mapping columns
+        firsts = [next(reader, None) for reader in readers]
+        streams = [itertools.chain([first], reader) for first, reader in zip(firsts, readers) if first]
+        column_map = ColumnMap(registry.schemas)
+        
+        writer = csv.writer(output)
+        writer.writerow(column_map.columns + ["Timestamp", CsvResponseStore.SCHEMA_COLUMN])
+        count = 0
+        for questions_id, answers, timestamp in heapq.merge(*streams, key=lambda row: row[2]):
+            writer.writerow(column_map.row(questions_id, answers) + [timestamp, questions_id])
+            count += 1
+        return count
+    finally:
+        for file in files:
+            file.close()
+
+def sqlite_rows_after(path, last_id, limit=5000):
+    """Up to limit (id, questions, answers, timestamp) rows of a Responses.sqlite3 saved after last_id
+    
+    Read on a connection of their own, so the form can keep writing (WAL) meanwhile.
+    """
+    reader = sqlite3.connect(path)
+    try:
+        schemas = {}
+        rows = []
+        for row_id, questions_id, timestamp, answers in reader.execute(
+                "SELECT id, schema_id, timestamp, answers FROM responses WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit)):
+            if questions_id not in schemas:
+                found = reader.execute("SELECT questions FROM schemas WHERE schema_id = ?",
+                                       (questions_id,)).fetchone()
+                schemas[questions_id] = json.loads(found[0]) if found else []
+            rows.append((row_id, schemas[questions_id], json.loads(answers), timestamp))
+        return rows
+    finally:
+        reader.close()
+
+def sqlite_last_id(path):
+    """ID of the newest committed row in a Responses.sqlite3 (0 if it has none)"""
+    reader = sqlite3.connect(path)
+    try:
+        return reader.execute("SELECT COALESCE(MAX(id), 0) FROM responses").fetchone()[0]
+    finally:
+        reader.close()
+
+class SqliteResponseStore:
+    """Responses kept in a SQLite database (WAL mode) instead of Responses.csv
+    
+    Answers are stored as a JSON list next to the ID of the question list they answer
+    (see schema_id), with indexes on timestamp and schema. Rows are committed in batches
+    like CsvResponseStore: after commit_rows rows or commit_interval seconds.
+    """
+    def __init__(self, path, commit_rows=10, commit_interval=1.0):
+        self.path = path
+        self.commit_rows = commit_rows
+        self.commit_interval = commit_interval
+        self.lock = threading.Lock()
+        self.uncommitted = 0
+        self.commit_timer = None
+        self.known_schemas = set()  # IDs already in the schemas table
+        self.ids = {}  # Tuple of questions -> schema ID, so appends don't rehash the question list
+        
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS schemas (
+                schema_id TEXT PRIMARY KEY,
+                questions TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY,
+                schema_id TEXT NOT NULL REFERENCES schemas(schema_id),
+                timestamp TEXT NOT NULL,
+                answers TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS responses_timestamp ON responses(timestamp);
+            CREATE INDEX IF NOT EXISTS responses_schema ON responses(schema_id, timestamp);""")
+        self.connection.commit()
+    
+    def _schema(self, questions, questions_id=None):
+        """Register a question list (once) and return its ID, which callers may already know"""
+        if questions_id is None:
+            key = tuple(questions)
+            questions_id = self.ids.get(key)
+            if questions_id is None:
+                questions_id = self.ids[key] = schema_id(questions)
+        if questions_id not in self.known_schemas:
+            self.connection.execute("INSERT OR IGNORE INTO schemas VALUES (?, ?)",
+                                    (questions_id, json.dumps(questions)))
+            self.known_schemas.add(questions_id)
+        return questions_id
+    
+    def append(self, header, row):
+        """Add one response; header and row end with the Timestamp column, as in the CSV
+        
+        Returns (None, row ID), the SQLite counterpart of CsvResponseStore's (inode, size).
+        """
+        with self.lock:
+            row_id = self.connection.execute(
+                "INSERT INTO responses (schema_id, timestamp, answers) VALUES (?, ?, ?)",
+                (self._schema(header[:-1]), row[-1], json.dumps(row[:-1]))).lastrowid
+            self.uncommitted += 1
+            if self.uncommitted >= self.commit_rows:
+                self._commit()
+            elif self.commit_timer is None:
+                self.commit_timer = threading.Timer(self.commit_interval, self.sync)
+                self.commit_timer.daemon = True
+                self.commit_timer.start()
+            return None, row_id
+    
+    def sync(self):
+        """Commit every pending row"""
+        with self.lock:
+            self._commit()
+    
+    def _commit(self):
+        if self.commit_timer is not None:
+            self.commit_timer.cancel()
+            self.commit_timer = None
+        if self.uncommitted:
+            self.connection.commit()
+            self.uncommitted = 0
+    
+    def close(self):
+        with self.lock:
+            self._commit()
+            self.connection.close()
+    
+    def import_csv(self, csv_path, batch_rows=50000):
+        """Bulk load a responses CSV and its archive segments, batch_rows rows per transaction
+        
+        Returns the row count.
+        """
+        archive = ResponseArchive(csv_path)
+        files = archive.files()
+        if not files:
+            raise FileNotFoundError(f"No responses found at {csv_path}")
+        count = 0
+        for path in files:
+            count += self._import_file(path, archive.registry, batch_rows)
+        return count
+    
+    def _import_file(self, csv_path, registry, batch_rows):
+        """Import one file; rows whose question list isn't in Schemas.jsonl are skipped and reported"""
+        count = 0
+        skipped = 0
+        with open_response_file(csv_path) as csvfile, self.lock:
+            rows = read_response_rows(csvfile, registry)
+            while True:
+                chunk = list(itertools.islice(rows, batch_rows))
+                if not chunk:
+                    break
+                batch = []
+                for questions_id, answers, timestamp in chunk:
+                    if questions_id not in registry.schemas:
+                        skipped += 1  # Nothing to put in the schemas table for it, so export couldn't map it
+                        continue
+                    if questions_id not in self.known_schemas:
+                        self._schema(registry.schemas[questions_id], questions_id)
+                    batch.append((questions_id, timestamp, json.dumps(answers)))
+                self.connection.executemany(
+                    "INSERT INTO responses (schema_id, timestamp, answers) VALUES (?, ?, ?)", batch)
+                self.connection.commit()
+                count += len(batch)
+        if skipped:
+            print(f"Skipped {skipped} row(s) in {csv_path} whose question list is missing from Schemas.jsonl")
+        return count
+    
+    def last_id(self):
+        with self.lock:
+            self._commit()
+            return self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM responses").fetchone()[0]
+    
+    def rows_after(self, last_id, limit=5000):
+        """Up to limit (id, questions, answers, timestamp) rows saved after last_id, read on their own connection"""
+        return sqlite_rows_after(self.path, last_id, limit)
+    
+    def export_csv(self, output, questions_id=None):
+        """Stream responses to a CSV file object in time order; returns the row count
+        
+        Responses to every question list are mapped onto their combined columns,
+        unless questions_id picks a single list.
+        """
+        with self.lock:
+            self._commit()
+            schemas = {row_id: json.loads(questions) for row_id, questions in
+                       self.connection.execute("SELECT schema_id, questions FROM schemas ORDER BY rowid")}
+        if questions_id is not None:
+            if questions_id not in schemas:
+                raise ValueError(f"No question list with ID {questions_id}")
+            schemas = {questions_id: schemas[questions_id]}
+        column_map = ColumnMap(schemas)
+        
+        writer = csv.writer(output)
+        writer.writerow(column_map.columns + ["Timestamp", CsvResponseStore.SCHEMA_COLUMN])
+        # A separate read connection lets the form keep writing (WAL) while this streams
+        reader = sqlite3.connect(self.path)
+        try:
+            if questions_id is None:
+                rows = reader.execute("SELECT schema_id, timestamp, answers FROM responses ORDER BY timestamp, id")
+            else:
+                rows = reader.execute("SELECT schema_id, timestamp, answers FROM responses "
+                                      "WHERE schema_id = ? ORDER BY timestamp, id", (questions_id,))
+            count = 0
+            for row_id, timestamp, answers in rows:
+                writer.writerow(column_map.row(row_id, json.loads(answers)) + [timestamp, row_id])
+                count += 1
+            return count
+        finally:
+            reader.close()
+
+STATS_HISTOGRAM_BINS = 20  # Number histograms keep at most twice this many bins
+STATS_TOP_K = 10  # Most common text answers reported per question
+
+def stats_kind(modifiers):
+    """How answers to a question are summarised: 'checkmark', 'number' or 'text'"""
+    if 'checkmark' in modifiers:
+        return 'checkmark'
+    if 'integer' in modifiers or 'number' in modifiers or any(m.startswith('range=') for m in modifiers):
+        return 'number'
+    return 'text'
+
+class QuestionStats:
+    """Running aggregates of the answers to one question
+    
+    Checkmarks count True answers. Numbers keep count, mean and variance (Welford),
+    min/max and a histogram whose bin width doubles whenever it would need more than
+    2 * STATS_HISTOGRAM_BINS bins. Text keeps approximate top answers with the
+    Space-Saving algorithm in a table of 10 * STATS_TOP_K entries.
+    """
+    TOP_CAPACITY = 10 * STATS_TOP_K
+    FIELDS = ('kind', 'asked', 'answered', 'trues', 'invalid', 'n', 'mean', 'm2', 'min', 'max', 'width')
+    
+    def __init__(self, kind, width=1.0):
+        self.kind = kind
+        self.asked = 0  # Responses that included the question
+        self.answered = 0  # ...with a non-blank answer
+        self.trues = 0
+        self.invalid = 0  # Number answers that weren't finite numbers (e.g. saved before a form edit)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.width = width
+        self.histogram = {}  # Bin (value // width) -> count
+        self.top = {}  # Answer -> count
+    
+    def add(self, answer):
+        """Count one answer"""
+        self.asked += 1
+        answer = answer.strip()
+        if not answer:
+            return
+        self.answered += 1
+        if self.kind == 'checkmark':
+            self.trues += answer == "True"
+        elif self.kind == 'number':
+            try:
+                value = float(answer)
+            except ValueError:
+                value = math.nan
+            if not math.isfinite(value):  # "inf", or too many digits for a float
+                self.invalid += 1
+                return
+            self._merge_numbers(1, value, 0.0, value, value)
+            self._merge_bins({int(value // self.width): 1})
+        else:
+            self._merge_top({answer[:100]: 1})
+    
+    def add_many(self, answers):
+        """Count a list of answers at once, vectorised with NumPy when it is available"""
+        if np is None or not answers:
+            for answer in answers:
+                self.add(answer)
+            return
+        values = np.char.strip(np.asarray(answers, dtype=str))
+        values = values[values != ""]
+        self.asked += len(answers)
+        self.answered += len(values)
+        if self.kind == 'checkmark':
+            self.trues += int(np.count_nonzero(values == "True"))
+        elif self.kind == 'number':
+            try:
+                numbers = values.astype(float)
+            except ValueError:
+                parsed = []
+                for value in values:
+                    try:
+                        parsed.append(float(value))
+                    except ValueError:
+                        self.invalid += 1
+                numbers = np.asarray(parsed, dtype=float)
+            finite = np.isfinite(numbers)
+            self.invalid += int(len(numbers) - np.count_nonzero(finite))
+            numbers = numbers[finite]
+            if len(numbers):
+                mean = float(numbers.mean())
+                self._merge_numbers(len(numbers), mean, float(((numbers - mean) ** 2).sum()),
+                                    float(numbers.min()), float(numbers.max()))
+                bins, counts = np.unique(np.floor(numbers / self.width).astype(np.int64), return_counts=True)
+                self._merge_bins(dict(zip(bins.tolist(), counts.tolist())))
+        elif len(values):
+            answers, counts = np.unique(values.astype('U100'), return_counts=True)
+            if len(answers) > self.TOP_CAPACITY:
+                keep = np.argpartition(counts, -self.TOP_CAPACITY)[-self.TOP_CAPACITY:]
+                answers, counts = answers[keep], counts[keep]
+            self._merge_top(dict(zip(answers.tolist(), counts.tolist())))
+    
+    def _merge_numbers(self, n, mean, m2, low, high):
+        """Combine with the count, mean, sum of squared deviations and range of more numbers (Chan et al.)"""
+        total = self.n + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+    
+    def _merge_bins(self, bins):
+        for index, count in bins.items():
+            self.histogram[index] = self.histogram.get(index, 0) + count
+        while len(self.histogram) > 2 * STATS_HISTOGRAM_BINS:
+            self.width *= 2
+            merged = {}
+            for index, count in self.histogram.items():
+                merged[index // 2] = merged.get(index // 2, 0) + count
+            self.histogram = merged
+    
+    def _merge_top(self, counts):
+        """Space-Saving: a new answer arriving at a full table takes over the least counted entry"""
+        for answer, count in counts.items():
+            if answer in self.top or len(self.top) < self.TOP_CAPACITY:
+                self.top[answer] = self.top.get(answer, 0) + count
+            else:
+                smallest = min(self.top, key=self.top.get)
+                self.top[answer] = self.top.pop(smallest) + count
+    
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+    
+    def describe(self):
+        """One line summary, e.g. for the stats command"""
+        text = f"{self.answered}/{self.asked} answered"
+        if self.kind == 'checkmark' and self.answered:
+            text += f", {self.trues / self.answered:.1%} checked"
+        elif self.kind == 'number' and self.n:
+            text += (f", mean {self.mean:.4g}, sd {self.variance() ** 0.5:.4g}, "
+                     f"min {self.min:.4g}, max {self.max:.4g}")
+        elif self.kind == 'text' and self.top:
+            top = sorted(self.top.items(), key=lambda item: -item[1])[:3]
+            text += ", most common: " + ", ".join(f"{answer!r} ({count})" for answer, count in top)
+        if self.invalid:
+            text += f", {self.invalid} not numbers"
+        return text
+    
+    def to_json(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data['histogram'] = [[index, count] for index, count in sorted(self.histogram.items())]
+        data['top'] = sorted(self.top.items(), key=lambda item: -item[1])
+        return data
+    
+    @classmethod
+    def from_json(cls, data):
+        stats = cls(data['kind'])
+        for field in cls.FIELDS:
+            setattr(stats, field, data[field])
+        stats.histogram = {index: count for index, count in data['histogram']}
+        stats.top = dict(data['top'])
+        return stats
+
+class ResponseStats:
+    """Per-question aggregates over every saved response, updated one response at a time
+    
+    The aggregates are snapshotted to a small JSON file along with how far into the
+    responses file they go (its inode and byte offset), so a restart only reads the
+    responses added since; anything else (the file was replaced or edited while the
+    form was closed) triggers rebuild(), a vectorised recompute over the whole
+    history in chunks. Questions are keyed by their text, so form edits keep their stats.
+    
+    With sqlite_path instead of csv_path the responses are read from a
+    Responses.sqlite3, and the offset is the ID of the last row counted.
+    """
+    SNAPSHOT_VERSION = 1
+    
+    def __init__(self, path, csv_path=None, kinds=None, widths=None, snapshot_rows=50, sqlite_path=None):
+        # snapshot_rows=0 keeps the aggregates in memory only
+        self.path = path
+        self.csv_path = csv_path
+        self.sqlite_path = sqlite_path
+        self.kinds = kinds or {}  # Question -> stats_kind; other questions are guessed from their answers
+        self.widths = widths or {}  # Question -> starting histogram bin width
+        self.snapshot_rows = snapshot_rows
+        self.lock = threading.Lock()
+        self.questions = {}  # Question -> QuestionStats
+        self.rows = 0
+        self.inode = None  # Of csv_path when offset was recorded
+        self.offset = 0  # How far into csv_path the aggregates go (or the last row ID counted from sqlite_path)
+        self.unsaved = 0
+    
+    def _new_stats(self, question, answer):
+        kind = self.kinds.get(question)
+        if kind is None:
+            kind = 'checkmark' if answer in ("True", "False") else 'text'
+            try:
+                float(answer)
+                kind = 'number'
+            except ValueError:
+                pass
+        return QuestionStats(kind, self.widths.get(question, 1.0))
+    
+    def _question(self, question, answer=""):
+        stats = self.questions.get(question)
+        if stats is None:
+            stats = self.questions[question] = self._new_stats(question, answer)
+        return stats
+    
+    def add(self, questions, answers, position=None):
+        """Count one response; position is the (inode, size) of the responses file after it, or (None, row ID)"""
+        with self.lock:
+            for question, answer in zip(questions, answers):
+                self._question(question, answer).add(answer)
+            self.rows += 1
+            if position is not None:
+                self.inode, self.offset = position
+            self.unsaved += 1
+            if self.snapshot_rows and self.unsaved >= self.snapshot_rows:
+                try:
+                    self._save()
+                except OSError as e:
+                    print(f"Could not save response statistics: {e}")  # The next snapshot will catch up
+    
+    def load(self):
+        """Read the snapshot; returns False if there isn't a usable one"""
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+            if (data.get('version') != self.SNAPSHOT_VERSION or data.get('csv_path') != self.csv_path
+                    or data.get('sqlite_path') != self.sqlite_path):
+                return False
+            questions = {question: QuestionStats.from_json(stats) for question, stats in data['questions'].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self.lock:
+            self.questions = questions
+            self.rows, self.inode, self.offset = data['rows'], data['inode'], data['offset']
+        return True
+    
+    def catch_up(self):
+        """Load the snapshot and count responses saved since, or rebuild if it can't be trusted"""
+        if self.sqlite_path is not None:
+            return self._catch_up_sqlite()
+        if self.csv_path is None:
+            self.load()
+            return self.rows
+        loaded = self.load()
+        if not os.path.exists(self.csv_path):
+            return self.rows
+        stat = os.stat(self.csv_path)
+        if not loaded or stat.st_ino != self.inode or stat.st_size < self.offset:
+            return self.rebuild()
+        registry = SchemaRegistry(os.path.join(os.path.dirname(os.path.abspath(self.csv_path)), "Schemas.jsonl"))
+        for end, (questions_id, answers, _) in tail_response_rows(self.csv_path, self.offset, registry):
+            self.add(registry.schemas.get(questions_id, []), answers, (stat.st_ino, end))
+        self.save()
+        return self.rows
+    
+    def _catch_up_sqlite(self):
+        loaded = self.load()
+        if not os.path.exists(self.sqlite_path):
+            return self.rows
+        if not loaded or sqlite_last_id(self.sqlite_path) < self.offset:
+            return self.rebuild()
+        while True:
+            rows = sqlite_rows_after(self.sqlite_path, self.offset)
+            if not rows:
+                break
+            for row_id, questions, answers, _ in rows:
+                self.add(questions, answers, (None, row_id))
+        self.save()
+        return self.rows
+    
+    def rebuild(self, chunk_rows=50000):
+        """Recompute everything from the responses file and its archive segments; returns the row count"""
+        questions = {}
+        rows = 0
+        inode = offset = None
+        
+        def add_chunk(chunk):
+            answers_by_question = {}
+            for chunk_questions, answers in chunk:
+                for question, answer in zip(chunk_questions, answers):
+                    answers_by_question.setdefault(question, []).append(answer)
+            for question, answers in answers_by_question.items():
+                if question not in questions:
+                    questions[question] = self._new_stats(question, next((a for a in answers if a.strip()), ""))
+                questions[question].add_many(answers)
+        
+        if self.sqlite_path is not None:
+            offset = 0
+            while os.path.exists(self.sqlite_path):
+                chunk = sqlite_rows_after(self.sqlite_path, offset, chunk_rows)
+                if not chunk:
+                    break
+                add_chunk([(chunk_questions, answers) for _, chunk_questions, answers, _ in chunk])
+                rows += len(chunk)
+                offset = chunk[-1][0]
+            with self.lock:
+                self.questions = questions
+                self.rows = rows
+                self.inode, self.offset = None, offset
+                self._save()
+            return rows
+        
+        archive = ResponseArchive(self.csv_path)
+        registry = archive.registry
+        for path in archive.files():
+            if path == archive.path:
+                inode = os.stat(path).st_ino
+                offset = 0
+                decoded_rows = tail_response_rows(path, 0, registry)
+            else:
+                file = open_response_file(path)
+                decoded_rows = ((None, decoded) for decoded in read_response_rows(file, registry))
+            try:
+                while True:
+                    chunk = []
+                    for end, (questions_id, answers, _) in itertools.islice(decoded_rows, chunk_rows):
+                        chunk.append((registry.schemas.get(questions_id, []), answers))
+                        offset = end if end is not None else offset
+                    if not chunk:
+                        break
+                    add_chunk(chunk)
+                    rows += len(chunk)
+            finally:
+                if path != archive.path:
+                    file.close()
+        
+        with self.lock:
+            self.questions = questions
+            self.rows = rows
+            self.inode, self.offset = inode, offset or 0
+            self._save()
+        return rows
+    
+    def copy(self):
+        """An in-memory copy that is never snapshotted, e.g. for a dashboard to keep adding to"""
+        copy = ResponseStats(self.path, self.csv_path, self.kinds, self.widths, snapshot_rows=0,
+                             sqlite_path=self.sqlite_path)
+        with self.lock:
+            copy.questions = {question: QuestionStats.from_json(stats.to_json())
+                              for question, stats in self.questions.items()}
+            copy.rows, copy.inode, copy.offset = self.rows, self.inode, self.offset
+        return copy
+    
+    def save(self):
+        with self.lock:
+            self._save()
+    
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {"version": self.SNAPSHOT_VERSION, "csv_path": self.csv_path, "sqlite_path": self.sqlite_path,
+                "rows": self.rows,
+                "inode": self.inode, "offset": self.offset,
+                "questions": {question: stats.to_json() for question, stats in self.questions.items()}}
+        with open(self.path + ".tmp", 'w') as file:
+            json.dump(data, file)
+        os.replace(self.path + ".tmp", self.path)
+        self.unsaved = 0
+
+class StatsDashboard:
+    """Operator window with live response counts, a chart per question and the latest responses
+    
+    It starts from a copy of the form's ResponseStats and then follows the response
+    store like `tail -f`: every UPDATE_INTERVAL ms a worker reads only what was
+    appended since its remembered byte offset (or row ID for SQLite), at most
+    ROWS_PER_UPDATE rows at a time, so it never rereads the file however long it runs.
+    """
+    UPDATE_INTERVAL = 1000  # ms
+    ROWS_PER_UPDATE = 5000
+    RECENT_ROWS = 100  # Latest responses listed (and all that is kept of them)
+    RATE_WINDOW = 600  # Seconds the "recent" count covers
+    CHART_WIDTH = 420
+    CHART_HEIGHT = 220
+    
+    def __init__(self, app, worker):
+        self.app = app
+        self.worker = worker
+        self.stats = app.stats.copy()
+        self.store = app.response_store
+        self.csv_path = app.stats.csv_path
+        self.registry = SchemaRegistry(os.path.join(os.path.dirname(os.path.abspath(self.csv_path)),
+                                                    "Schemas.jsonl")) if self.csv_path else None
+        self.inode, self.offset = self.stats.inode, self.stats.offset
+        self.last_id = self.stats.offset if isinstance(self.store, SqliteResponseStore) else 0  # Counted up to here
+        self.recent = collections.deque(maxlen=self.RECENT_ROWS)
+        self.arrivals = collections.deque()  # Arrival times within RATE_WINDOW
+        self.selected = None
+        self.closed = False
+        
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Live Statistics")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.total_label = tk.Label(self.window, anchor="w", font=("Times New Roman", 12, "bold"))
+        self.total_label.pack(fill="x", padx=10, pady=(10, 5))
+        
+        middle = tk.Frame(self.window)
+        middle.pack(fill="both", expand=True, padx=10)
+        self.question_list = tk.Listbox(middle, width=40, exportselection=False)
+        self.question_list.pack(side="left", fill="y")
+        self.question_list.bind("<<ListboxSelect>>", self._on_select)
+        chart_frame = tk.Frame(middle)
+        chart_frame.pack(side="left", fill="both", expand=True, padx=(10, 0))
+        self.chart = tk.Canvas(chart_frame, width=self.CHART_WIDTH, height=self.CHART_HEIGHT, bg="white")
+        self.chart.pack()
+        self.summary_label = tk.Label(chart_frame, anchor="w", justify="left", wraplength=self.CHART_WIDTH)
+        self.summary_label.pack(fill="x", pady=(5, 0))
+        
+        tk.Label(self.window, text="Latest responses", anchor="w").pack(fill="x", padx=10, pady=(10, 0))
+        self.recent_list = tk.Listbox(self.window, height=8)
+        self.recent_list.pack(fill="x", padx=10, pady=(0, 10))
+        
+        self._refresh_questions()
+        self._update()
+    
+    def close(self):
+        self.closed = True
+        self.window.destroy()
+    
+    def _read_new_rows(self):
+        """Worker thread: count rows appended since the last update; returns them for the recent list"""
+        new_rows = []
+        if isinstance(self.store, SqliteResponseStore):
+            for row_id, questions, answers, timestamp in self.store.rows_after(self.last_id, self.ROWS_PER_UPDATE):
+                self.stats.add(questions, answers)
+                new_rows.append((timestamp, answers))
+                self.last_id = row_id
+            return new_rows
+        if not self.csv_path or not os.path.exists(self.csv_path):
+            return new_rows
+        
+        stat = os.stat(self.csv_path)
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            # Rotated (or replaced) since the last update: finish the file being read, now an
+            # archive segment, and any segments after it before starting on the new file
+            if self.inode is not None and self.store.archive is not None:
+                new_rows, finished = self._tail_segments(self.ROWS_PER_UPDATE)
+                if not finished:
+                    return new_rows  # More to read next time
+            self.inode, self.offset = stat.st_ino, 0
+        return new_rows + self._tail(self.csv_path, self.ROWS_PER_UPDATE - len(new_rows))
+    
+    def _tail_segments(self, limit):
+        """Read on from the archive segment that was being read; returns (rows, whether all segments are done)"""
+        archive = self.store.archive
+        folder = os.path.dirname(archive.path)
+        archived, pending = archive.snapshot()
+        segments = [(entry["number"], entry.get("inode"), os.path.join(folder, entry["file"]))
+                    for entry in archived]
+        try:
+            segments += [(archive._number(path), os.stat(path).st_ino, path) for path in pending]
+        except FileNotFoundError:
+            return [], False  # Compressed while listing; try again next time
+        segments.sort()
+        inodes = [inode for _, inode, _ in segments]
+        if self.inode not in inodes:
+            return [], True
+        
+        # Inodes of deleted files get reused, so the newest segment with ours is the one we were reading
+        rows = []
+        for _, inode, path in segments[len(inodes) - 1 - inodes[::-1].index(self.inode):]:
+            if inode != self.inode:
+                self.inode, self.offset = inode, 0
+            try:
+                rows += self._tail(path, limit - len(rows))
+            except FileNotFoundError:
+                return rows, False
+            if len(rows) >= limit:
+                return rows, False
+        return rows, True
+    
+    def _tail(self, path, limit):
+        rows = []
+        for end, (questions_id, answers, timestamp) in itertools.islice(
+                tail_response_rows(path, self.offset, self.registry), limit):
+            if questions_id not in self.registry.schemas:
+                self.registry.reload()
+            self.stats.add(self.registry.schemas.get(questions_id, []), answers)
+            rows.append((timestamp, answers))
+            self.offset = end
+        return rows
+    
+    def _update(self):
+        if not self.closed:
+            self.worker.run(self._read_new_rows, self._on_rows)
+    
+    def _on_rows(self, rows, error):
+        if self.closed:
+            return
+        if error is not None:
+            self.total_label.config(text=f"Could not read new responses: {error}")
+        elif rows:
+            now = time.monotonic()
+            self.arrivals.extend([now] * len(rows))
+            for timestamp, answers in rows:
+                self.recent.appendleft(f"{timestamp}  " + " | ".join(answer for answer in answers[:6] if answer))
+            self.recent_list.delete(0, "end")
+            self.recent_list.insert("end", *self.recent)
+            if self.question_list.size() != len(self.stats.questions):
+                self._refresh_questions()
+            self._draw_selected()
+        
+        while self.arrivals and self.arrivals[0] < time.monotonic() - self.RATE_WINDOW:
+            self.arrivals.popleft()
+        if error is None:
+            self.total_label.config(text=f"{self.stats.rows} responses, "
+                                         f"{len(self.arrivals)} in the last {self.RATE_WINDOW // 60} minutes")
+        self.window.after(self.UPDATE_INTERVAL, self._update)
+    
+    def _refresh_questions(self):
+        with self.stats.lock:
+            questions = list(self.stats.questions)
+        self.questions = questions
+        self.question_list.delete(0, "end")
+        self.question_list.insert("end", *questions)
+        if self.selected in questions:
+            self.question_list.selection_set(questions.index(self.selected))
+    
+    def _on_select(self, event=None):
+        selection = self.question_list.curselection()
+        if selection:
+            self.selected = self.questions[selection[0]]
+            self._draw_selected()
+    
+    def _draw_selected(self):
+        """Redraw the chart for the selected question from its current aggregates"""
+        if self.selected is None:
+            return
+        with self.stats.lock:
+            stats = self.stats.questions.get(self.selected)
+            if stats is None:
+                return
+            summary = stats.describe()
+            if stats.kind == 'checkmark':
+                bars = [("Checked", stats.trues), ("Not checked", stats.answered - stats.trues)]
+            elif stats.kind == 'number':
+                bars = [(f"{index * stats.width:.4g}", count) for index, count in sorted(stats.histogram.items())]
+            else:
+                bars = sorted(stats.top.items(), key=lambda item: -item[1])[:STATS_TOP_K]
+        self.summary_label.config(text=f"{self.selected}\n{summary}")
+        
+        self.chart.delete("all")
+        if not bars:
+            return
+        top = max(count for _, count in bars) or 1
+        margin = 20
+        slot = (self.CHART_WIDTH - 2 * margin) / len(bars)
+        for position, (label, count) in enumerate(bars):
+            x0 = margin + position * slot
+            height = (self.CHART_HEIGHT - 2 * margin) * count / top
+            self.chart.create_rectangle(x0 + 1, self.CHART_HEIGHT - margin - height, x0 + slot - 1,
+                                        self.CHART_HEIGHT - margin, fill="steel blue", outline="")
+            if len(bars) <= STATS_TOP_K or position % max(1, len(bars) // 5) == 0:
+                self.chart.create_text(x0 + slot / 2, self.CHART_HEIGHT - margin / 2, text=str(label)[:12],
+                                       font=("Times New Roman", 8))
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 16-byte digests; might_contain never misses an added digest"""
+    def __init__(self, capacity, false_positive_rate=0.01):
+        self.capacity = capacity
+        # Standard sizing: m = -n ln p / (ln 2)^2 bits and k = m/n ln 2 hashes
+        self.size = max(64, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, digest):
+        # Double hashing: bit i is h1 + i * h2, from the two halves of the digest
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:16], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+    
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def might_contain(self, digest):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+class UniqueIndex:
+    """Every answer given so far to <unique> questions, for O(1) duplicate checks at submit time
+    
+    Answers are stored as (question, digest of the stripped, case-folded answer) in a
+    SQLite table, fronted by a Bloom filter so the usual case (a new answer) never
+    touches the disk. The filter is saved next to the database with the number of
+    writes it covers and rebuilt from the table whenever that doesn't match.
+    Answers being saved are held in `pending` so two quick submissions can't both pass.
+    """
+    def __init__(self, path, capacity=100000):
+        self.path = path
+        self.bloom_path = path + ".bloom"
+        self.lock = threading.Lock()
+        self.pending = set()  # (question, digest) of answers accepted but not yet saved
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS answers (question TEXT NOT NULL, digest BLOB NOT NULL, "
+                                "PRIMARY KEY (question, digest)) WITHOUT ROWID")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        self.connection.commit()
+        self.writes = self._meta('writes')
+        self.bloom = self._load_bloom(capacity)
+    
+    @staticmethod
+    def digest(question, answer):
+        return hashlib.blake2b(f"{question}\0{answer.strip().casefold()}".encode('utf-8'), digest_size=16).digest()
+    
+    def _meta(self, key, default=0):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+    
+    def indexed_questions(self):
+        """Questions whose earlier answers have all been indexed"""
+        return set(json.loads(self._meta('questions', '[]')))
+    
+    def mark_indexed(self, questions):
+        with self.lock:
+            indexed = sorted(self.indexed_questions() | set(questions))
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('questions', ?)",
+                                    (json.dumps(indexed),))
+            self.connection.commit()
+    
+    def _load_bloom(self, capacity):
+        try:
+            with open(self.bloom_path, 'rb') as file:
+                header = json.loads(file.readline())
+                if header['writes'] == self.writes:
+                    bloom = BloomFilter(header['capacity'])
+                    bloom.count = header['count']
+                    bloom.bits = bytearray(file.read())
+                    if len(bloom.bits) == (bloom.size + 7) // 8:
+                        return bloom
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return self._rebuild_bloom(capacity)
+    
+    def _rebuild_bloom(self, capacity):
+        """A filter holding every stored answer, streamed from the table"""
+        count = self.connection.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        bloom = BloomFilter(max(capacity, 2 * count))
+        for (digest,) in self.connection.execute("SELECT digest FROM answers"):
+            bloom.add(digest)
+        return bloom
+    
+    def _save_bloom(self):
+        with open(self.bloom_path + ".tmp", 'wb') as file:
+            header = {"writes": self.writes, "capacity": self.bloom.capacity, "count": self.bloom.count}
+            file.write(json.dumps(header).encode('utf-8') + b"\n")
+            file.write(self.bloom.bits)
+        os.replace(self.bloom_path + ".tmp", self.bloom_path)
+    
+    def contains(self, question, answer):
+        """Whether this answer to this question was already given (or is being saved)"""
+        digest = self.digest(question, answer)
+        with self.lock:
+            if (question, digest) in self.pending:
+                return True
+            if not self.bloom.might_contain(digest):
+                return False
+            return self.connection.execute("SELECT 1 FROM answers WHERE question = ? AND digest = ?",
+                                           (question, digest)).fetchone() is not None
+    
+    def claim(self, pairs):
+        """Hold (question, answer) pairs that passed the check until they are saved or released"""
+        with self.lock:
+            self.pending.update((question, self.digest(question, answer)) for question, answer in pairs)
+    
+    def release(self, pairs):
+        with self.lock:
+            self.pending.difference_update((question, self.digest(question, answer)) for question, answer in pairs)
+    
+    def add(self, pairs):
+        """Record saved (question, answer) pairs"""
+        entries = [(question, self.digest(question, answer)) for question, answer in pairs if answer.strip()]
+        with self.lock:
+            self.connection.executemany("INSERT OR IGNORE INTO answers (question, digest) VALUES (?, ?)", entries)
+            self.writes += 1
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('writes', ?)", (self.writes,))
+            self.connection.commit()
+            for entry in entries:
+                self.bloom.add(entry[1])
+                self.pending.discard(entry)
+            if self.bloom.count > self.bloom.capacity:
+                self.bloom = self._rebuild_bloom(2 * self.bloom.capacity)
+    
+    def rebuild(self, rows, unique_questions, batch_rows=50000):
+        """Index the answers to unique_questions in rows of (questions, answers), in one streaming pass"""
+        unique_questions = set(unique_questions)
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, batch_rows))
+            if not batch:
+                break
+            self.add([(question, answer) for questions, answers in batch
+                      for question, answer in zip(questions, answers) if question in unique_questions])
+    
+    def close(self):
+        with self.lock:
+            self._save_bloom()
+            self.connection.close()
+
+class LookupIndex:
+    """The values of a reference list (e.g. a member roster) for <lookup=file.csv> questions
+    
+    The first column of every row is a value. Values are kept sorted by their
+    case-folded text, with a second sorted list of every word in them, so a binary
+    search finds both "Smi" and "Jo" in "John Smith" within a millisecond, even for
+    hundreds of thousands of values. load() runs in the background; `ready` is set
+    once it is done.
+    """
+    FUZZY_CANDIDATES = 300  # Values sorting near the typed text (and near its last word) to close-match against
+    
+    def __init__(self, path):
+        self.path = path
+        self.ready = threading.Event()
+        self.keys = []  # Case-folded values, sorted
+        self.values = []  # Values as written, in the same order
+        self.words = []  # (case-folded word, position in values), sorted
+    
+    def load(self):
+        values = {}
+        with open(self.path, 'r', newline='', encoding='utf-8-sig') as file:
+            for row in csv.reader(file):
+                if row and row[0].strip():
+                    values.setdefault(row[0].strip().casefold(), row[0].strip())
+        keys = sorted(values)
+        self.values = [values[key] for key in keys]
+        self.words = sorted((word, position) for position, key in enumerate(keys)
+                            for word in key.split()[1:])
+        self.keys = keys
+        self.ready.set()
+        return len(keys)
+    
+    def contains(self, text):
+        """Whether text is one of the values (ignoring case); check `ready` first, this never waits"""
+        key = text.strip().casefold()
+        position = bisect.bisect_left(self.keys, key)
+        return position < len(self.keys) and self.keys[position] == key
+    
+    def suggest(self, text, limit=8):
+        """Values starting with text, then values with a later word starting with it, then close matches"""
+        key = text.strip().casefold()
+        if not key or not self.ready.is_set():
+            return []
+        positions = []
+        position = bisect.bisect_left(self.keys, key)
+        while position < len(self.keys) and len(positions) < limit and self.keys[position].startswith(key):
+            positions.append(position)
+            position += 1
+        index = bisect.bisect_left(self.words, (key,))
+        while index < len(self.words) and len(positions) < limit and self.words[index][0].startswith(key):
+            if self.words[index][1] not in positions:
+                positions.append(self.words[index][1])
+            index += 1
+        if not positions:
+            # Probably a typo: look for close matches among values that sort near the
+            # typed text or whose later words sort near its last word
+            position = bisect.bisect_left(self.keys, key[:2])
+            nearby = self.keys[position:position + self.FUZZY_CANDIDATES]
+            last_word = key.split()[-1]
+            index = bisect.bisect_left(self.words, (last_word[:2],))
+            nearby += [self.keys[position] for _, position in self.words[index:index + self.FUZZY_CANDIDATES]]
+            matches = difflib.get_close_matches(key, nearby, n=limit, cutoff=0.6)
+            positions = [bisect.bisect_left(self.keys, match) for match in dict.fromkeys(matches)]
+        return [self.values[position] for position in positions]
+
+class LookupDropdown:
+    """Suggestion list under an Entry for <lookup=...> questions, refreshed shortly after typing pauses
+    
+    source() returns the LookupIndex for the question the entry currently shows, or
+    None, so one dropdown can follow a pooled row from question to question.
+    """
+    DEBOUNCE = 120  # ms after the last key press before suggestions are looked up
+    
+    def __init__(self, app, entry, source):
+        self.app = app
+        self.entry = entry
+        self.source = source
+        self.popup = None
+        self.listbox = None
+        self.pending = None
+        entry.bind('<KeyRelease>', self._on_key, add="+")
+        entry.bind('<Down>', self._focus_list, add="+")
+        entry.bind('<Escape>', lambda event: self.hide(), add="+")
+        entry.bind('<FocusOut>', lambda event: entry.after(150, self._hide_unless_focused), add="+")
+    
+    def _on_key(self, event):
+        if event.keysym in ('Down', 'Up', 'Return', 'Escape', 'Tab'):
+            return
+        if self.pending is not None:
+            self.entry.after_cancel(self.pending)
+        self.pending = self.entry.after(self.DEBOUNCE, self._update)
+    
+    def _update(self):
+        self.pending = None
+        index = self.source()
+        text = self.entry.get()
+        suggestions = index.suggest(text) if index is not None else []
+        if not suggestions or suggestions == [text]:
+            self.hide()
+            return
+        if self.popup is None:
+            self.popup = tk.Toplevel(self.entry)
+            self.popup.overrideredirect(True)
+            self.listbox = tk.Listbox(self.popup, height=8, exportselection=False)
+            self.listbox.pack(fill="both", expand=True)
+            self.listbox.bind('<ButtonRelease-1>', self._choose)
+            self.listbox.bind('<Return>', self._choose)
+            self.listbox.bind('<Escape>', lambda event: (self.hide(), self.entry.focus_set()))
+            self.listbox.bind('<FocusOut>', lambda event: self.entry.after(150, self._hide_unless_focused))
+        self.listbox.delete(0, "end")
+        self.listbox.insert("end", *suggestions)
+        self.listbox.config(height=len(suggestions))
+        self.popup.geometry(f"{self.entry.winfo_width()}x{self.listbox.winfo_reqheight()}"
+                            f"+{self.entry.winfo_rootx()}+{self.entry.winfo_rooty() + self.entry.winfo_height()}")
+        self.popup.deiconify()
+        self.popup.lift()
+    
+    def _focus_list(self, event):
+        if self.popup is not None and self.popup.winfo_viewable():
+            self.listbox.focus_set()
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+            return "break"
+    
+    def _choose(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.entry.delete(0, "end")
+            self.entry.insert(0, self.listbox.get(selection[0]))
+        self.hide()
+        self.entry.focus_set()
+        self.entry.icursor("end")
+    
+    def _hide_unless_focused(self):
+        focus = self.entry.focus_get()
+        if focus is not self.entry and focus is not self.listbox:
+            self.hide()
+    
+    def hide(self):
+        if self.popup is not None:
+            self.popup.withdraw()
+
+MP3_BITRATES = {  # kbit/s by bitrate index, for Layer III
+    'MPEG1': [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    'MPEG2': [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+def mp3_duration(path):
+    """Length of an MP3 in seconds from its first frame header (and Xing/Info frame count), or None"""
+    with open(path, 'rb') as file:
+        file_size = os.fstat(file.fileno()).st_size
+        data = file.read(10)
+        start = 0
+        if data[:3] == b'ID3' and len(data) == 10:
+            # Skip the ID3v2 tag: its size is four 7-bit bytes, plus a footer if flagged
+            start = 10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9])
+            if data[5] & 0x10:
+                start += 10
+        file.seek(start)
+        data = file.read(16 * 1024)
+    
+    for offset in range(len(data) - 4):
+        if data[offset] != 0xff or data[offset + 1] & 0xe0 != 0xe0:
+            continue
+        version = (data[offset + 1] >> 3) & 3
+        layer = (data[offset + 1] >> 1) & 3
+        bitrate_index = data[offset + 2] >> 4
+        rate_index = (data[offset + 2] >> 2) & 3
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue  # Not a Layer III frame header
+        mpeg1 = version == 3
+        bitrate = MP3_BITRATES['MPEG1' if mpeg1 else 'MPEG2'][bitrate_index] * 1000
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        samples_per_frame = 1152 if mpeg1 else 576
+        mono = data[offset + 3] >> 6 == 3
+        xing = offset + 4 + ((17 if mono else 32) if mpeg1 else (9 if mono else 17))
+        if data[xing:xing + 4] in (b'Xing', b'Info') and data[xing + 7] & 1:
+            frames = int.from_bytes(data[xing + 8:xing + 12], 'big')
+            return frames * samples_per_frame / sample_rate
+        return (file_size - start - offset) * 8 / bitrate
+    return None
+
+class AudioPlayer:
+    """Plays the form's audio in-process through pygame.mixer, one item at a time
+    
+    Short clips (up to PRELOAD_BYTES on disk) are decoded ahead of time into Sound
+    buffers, kept in an LRU cache holding at most cache_bytes of decoded audio, so a
+    click starts them within one mixer buffer. Longer files, and seeking, stream
+    through mixer.music. position() is tracked with our own clock because Sound
+    channels don't report one.
+    """
+    PRELOAD_BYTES = 1024 * 1024
+    
+    def __init__(self, cache_bytes=64 * 1024 * 1024):
+        self.cache_bytes = cache_bytes
+        self.cache = collections.OrderedDict()  # Path -> Sound, least recently played first
+        self.cached_bytes = 0
+        self.lock = threading.Lock()
+        self.channel = None  # Channel playing a cached Sound, if that is what's playing
+        self.current = None  # Path playing or paused
+        self.paused_at = None  # Position when paused
+        self.started_at = 0.0  # time.monotonic() at which position 0 would have been
+    
+    def preload(self, paths):
+        """Decode the short clips among paths into the cache on a background thread"""
+        def load_all():
+            for path in paths:
+                try:
+                    if os.path.getsize(path) <= self.PRELOAD_BYTES:
+                        self._load(path)
+                except (OSError, pygame.error) as e:
+                    print(f"Could not preload {path}: {e}")
+        threading.Thread(target=load_all, daemon=True).start()
+    
+    def _load(self, path):
+        sound = pygame.mixer.Sound(path)
+        frequency, size, channels = pygame.mixer.get_init()
+        decoded_bytes = int(sound.get_length() * frequency * channels * abs(size) // 8)
+        with self.lock:
+            if path in self.cache:
+                return
+            self.cache[path] = (sound, decoded_bytes)
+            self.cached_bytes += decoded_bytes
+            while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+                _, (_, evicted_bytes) = self.cache.popitem(last=False)
+                self.cached_bytes -= evicted_bytes
+    
+    def duration(self, path):
+        """Length in seconds, or None if it can't be told without decoding"""
+        with self.lock:
+            cached = self.cache.get(path)
+        if cached is not None:
+            return cached[0].get_length()
+        try:
+            return mp3_duration(path) if path.lower().endswith('.mp3') else None
+        except OSError:
+            return None
+    
+    def play(self, path, start=0.0):
+        self.stop()
+        with self.lock:
+            cached = self.cache.get(path)
+            if cached is not None:
+                self.cache.move_to_end(path)
+        if cached is not None and start == 0:
+            self.channel = cached[0].play()
+        else:
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.play(start=start)
+        self.current = path
+        self.paused_at = None
+        self.started_at = time.monotonic() - start
+    
+    def toggle_pause(self):
+        if self.current is None:
+            return
+        if self.paused_at is None:
+            self.paused_at = self.position()
+            if self.channel is not None:
+                self.channel.pause()
+            else:
+                pygame.mixer.music.pause()
+        else:
+            self.started_at = time.monotonic() - self.paused_at
+            self.paused_at = None
+            if self.channel is not None:
+                self.channel.unpause()
+            else:
+                pygame.mixer.music.unpause()
+    
+    def seek(self, seconds):
+        """Jump within the current item, keeping it paused if it was"""
+        if self.current is None:
+            return
+        paused = self.paused_at is not None
+        self.play(self.current, start=max(0.0, seconds))
+        if paused:
+            self.toggle_pause()
+    
+    def position(self):
+        if self.current is None:
+            return 0.0
+        return self.paused_at if self.paused_at is not None else time.monotonic() - self.started_at
+    
+    def is_active(self):
+        """Whether something is playing or paused (False once it has finished)"""
+        if self.current is None:
+            return False
+        if self.paused_at is not None:
+            return True
+        busy = self.channel.get_busy() if self.channel is not None else pygame.mixer.music.get_busy()
+        if not busy:
+            self.current = None
+        return busy
+    
+    def stop(self):
+        if self.channel is not None:
+            self.channel.stop()
+            self.channel = None
+        if pygame.mixer.get_init():
+            pygame.mixer.music.stop()
+        self.current = None
+        self.paused_at = None
+
+class VlcPlayer:
+    """One long-lived VLC process, started on first use, driven through its RC interface
+    
+    VLC runs without an interface of its own (only its video window shows while
+    something plays) and takes RC commands ("add <file>", "stop", "quit") on a
+    localhost TCP port, which works the same on Windows, where RC can't read stdin.
+    Commands go through a worker thread so starting VLC never blocks the form. If
+    VLC has gone (e.g. its window was closed) the next play starts it again, while
+    "stop" is simply dropped; shutdown() asks it to quit, killing it if it doesn't.
+    """
+    CONNECT_TIMEOUT = 15  # Seconds VLC gets to open its RC port after starting
+    NO_START = ("stop", "quit")  # Commands that mean nothing to a VLC that isn't running, so never start one
+    QUIT = object()
+    
+    def __init__(self, vlc_path):
+        self.vlc_path = vlc_path
+        self.process = None
+        self.port = None
+        self.connection = None
+        self.commands = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+    
+    def start(self):
+        """Start VLC now (e.g. at form load) so the first play doesn't wait for it"""
+        self._send(None)
+    
+    def play(self, path):
+        self._send("clear")
+        self._send(f"add {os.path.abspath(path)}")
+    
+    def stop(self):
+        if self.thread is not None:
+            self._send("stop")
+    
+    def _send(self, command):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        self.commands.put(command)
+    
+    def _run(self):
+        """Worker thread: send each queued command, starting or reconnecting to VLC as needed"""
+        while True:
+            command = self.commands.get()
+            if command is self.QUIT:
+                return
+            if command in self.NO_START and self.connection is None:
+                continue  # Nothing running to stop or quit
+            for attempt in range(2):
+                try:
+                    if command not in self.NO_START:
+                        self._ensure_running()
+                    if command is not None:
+                        self.connection.sendall((command + "\n").encode('utf-8'))
+                        self._drain()
+                    break
+                except OSError as e:
+                    self._disconnect()
+                    if command in self.NO_START:
+                        break  # VLC has gone (e.g. its window was closed), so there is nothing left to do
+                    if attempt:
+                        print(f"Could not control VLC: {e}")
+                        break
+    
+    def _ensure_running(self):
+        if self.connection is not None:
+            return
+        if self.port is not None and self._connect(deadline=time.monotonic() + 0.5):
+            return  # Still running (the launcher process may have exited but VLC hasn't)
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        arguments = [self.vlc_path, "--intf", "dummy", "--extraintf", "rc",
+                     "--rc-host", f"127.0.0.1:{self.port}", "--no-video-title-show"]
+        if platform.system() == 'Windows':
+            arguments += ["--dummy-quiet", "--rc-quiet"]  # No console windows
+        self.process = subprocess.Popen(arguments, stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not self._connect(deadline=time.monotonic() + self.CONNECT_TIMEOUT):
+            raise OSError("VLC did not open its control port")
+    
+    def _connect(self, deadline):
+        while time.monotonic() < deadline:
+            try:
+                self.connection = socket.create_connection(("127.0.0.1", self.port), timeout=1)
+                self._drain()  # Welcome banner
+                return True
+            except OSError:
+                time.sleep(0.1)
+        return False
+    
+    def _drain(self):
+        """Read and discard VLC's replies so its output never fills the socket"""
+        self.connection.settimeout(0.05)
+        try:
+            while self.connection.recv(4096):
+                pass
+        except socket.timeout:
+            pass
+        finally:
+            self.connection.settimeout(1)
+    
+    def _disconnect(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+            self.connection = None
+    
+    def shutdown(self, timeout=2):
+        """Ask VLC to quit and make sure its process is gone"""
+        if self.thread is None:
+            return
+        self.commands.put("quit")
+        self.commands.put(self.QUIT)
+        self.thread.join(timeout)
+        self._disconnect()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+MEDIA_MANIFEST_VERSION = 3  # Bump when the manifest layout changes
+MEDIA_EXTENSIONS = {'.png': 'image', '.jpg': 'image', '.jpeg': 'image', '.mp4': 'video', '.mp3': 'audio'}
+NOT_VIDEO_BRANDS = (b'heic', b'heix', b'mif1', b'avif', b'M4A ')  # ISO media files that aren't MP4 video
+
+def sniff_media_type(path):
+    """'image', 'video' or 'audio' from a file's first bytes, falling back to its extension"""
+    with open(path, 'rb') as file:
+        head = file.read(12)
+    if head.startswith((b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff')):
+        return 'image'
+    if head[4:8] == b'ftyp' and head[8:12] not in NOT_VIDEO_BRANDS:
+        return 'video'
+    if head.startswith(b'ID3') or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'audio'  # ID3 tag or an MPEG audio frame sync
+    return MEDIA_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+def probe_media(path, media_type):
+    """Dimensions of an image, or duration (and size) of a video or audio file, read from headers"""
+    if media_type == 'image':
+        with Image.open(path) as img:
+            width, height = img.size
+        return {'width': width, 'height': height}
+    if media_type == 'audio':
+        return {'duration': mp3_duration(path)}
+    if media_type == 'video' and cv2 is not None:
+        capture = cv2.VideoCapture(path)
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+            return {'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) or None,
+                    'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None,
+                    'duration': frames / fps if fps and frames > 0 else None}
+        finally:
+            capture.release()
+    return {}
+
+class MediaManifest:
+    """Index of everything in Media_Data, built with os.scandir and kept between runs
+    
+    Each file has its size, mtime, type (sniffed from its first bytes) and its
+    dimensions or duration, so laying out and showing media needs no per-item stat
+    or header read. refresh() stats each folder and lists only those whose mtime
+    changed, so an untouched Media_Data costs one stat per folder. A listed folder
+    is read with os.scandir (on Windows the listing carries every file's size and
+    mtime) and only files whose size or mtime changed are re-probed. Copying over a
+    file leaves its folder's mtime alone, so verify() checks the files the questions
+    actually use.
+    
+    Names are matched with os.path.normcase, so on Windows "Photo.JPG" in
+    Questions.txt finds photo.jpg, as it always has.
+    """
+    def __init__(self, folder, path):
+        self.folder = folder
+        self.path = path
+        self.folders = {}  # Folder relative to Media_Data ('' is the top) -> {'mtime_ns', 'files', 'subfolders'}
+        self.entries = {}  # normcase('sub/name.png') -> record
+        self.dirty = False
+        self.load()
+    
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if data.get('version') == MEDIA_MANIFEST_VERSION and data.get('folder') == os.path.abspath(self.folder):
+                self.folders = data['folders']
+        except (OSError, ValueError, KeyError):
+            self.folders = {}
+    
+    def refresh(self):
+        """Bring the index up to date, listing only folders that changed since the last run"""
+        folders = {}
+        pending = ['']
+        while pending:
+            relative = pending.pop()
+            known = self.folders.get(relative)
+            try:
+                mtime_ns = os.stat(os.path.join(self.folder, relative)).st_mtime_ns
+                if time.time_ns() - mtime_ns < 2 * 10**9:
+                    mtime_ns = None  # Changed within the mtime resolution, so it could change again unseen
+                if known is None or mtime_ns is None or known['mtime_ns'] != mtime_ns:
+                    known = self._scan(relative, known, mtime_ns)
+            except OSError:
+                self.dirty = True  # The folder has gone
+                continue
+            folders[relative] = known
+            pending.extend(known['subfolders'])
+        self.dirty = self.dirty or folders.keys() != self.folders.keys()
+        self.folders = folders
+        self.entries = {self._key((relative + '/' if relative else '') + name): record
+                        for relative, known in folders.items() for name, record in known['files'].items()}
+        if self.dirty:
+            self.save()
+    
+    @staticmethod
+    def _key(media_file):
+        return os.path.normcase(media_file.replace('\\', '/').lstrip('/'))
+    
+    def _scan(self, relative, known, mtime_ns):
+        """One os.scandir pass over a folder, keeping records of files that are unchanged"""
+        old_files = known['files'] if known is not None else {}
+        files, subfolders = {}, []
+        with os.scandir(os.path.join(self.folder, relative)) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subfolders.append(os.path.join(relative, entry.name).replace(os.sep, '/'))
+                    continue
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()  # Free on Windows, where scandir already has it
+                record = old_files.get(entry.name)
+                if record is None or record['size'] != stat.st_size or record['mtime_ns'] != stat.st_mtime_ns:
+                    self.dirty = True
+                    record = self._probe(entry.path, stat)
+                files[entry.name] = record
+        subfolders.sort()
+        if known is None or known['mtime_ns'] != mtime_ns or files.keys() != old_files.keys() \
+                or subfolders != known['subfolders']:
+            self.dirty = True
+        return {'mtime_ns': mtime_ns, 'files': files, 'subfolders': subfolders}
+    
+    @staticmethod
+    def _probe(path, stat):
+        record = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        try:
+            record['type'] = sniff_media_type(path)
+            record.update(probe_media(path, record['type']))
+        except Exception as e:
+            record.setdefault('type', MEDIA_EXTENSIONS.get(os.path.splitext(path)[1].lower()))
+            record['error'] = str(e)
+        return record
+    
+    def verify(self, media_files):
+        """Re-probe any of these files that was copied over since its folder was listed"""
+        for media_file in media_files:
+            record = self.get(media_file)
+            if record is None:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, media_file))
+            except OSError:
+                continue
+            if record['size'] != stat.st_size or record['mtime_ns'] != stat.st_mtime_ns:
+                # The same dict sits in self.folders, so the saved manifest picks this up too
+                fresh = self._probe(os.path.join(self.folder, media_file), stat)
+                record.clear()
+                record.update(fresh)
+                self.dirty = True
+        if self.dirty:
+            self.save()
+    
+    def save(self):
+        data = {'version': MEDIA_MANIFEST_VERSION, 'folder': os.path.abspath(self.folder), 'folders': self.folders}
+        temp_file = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump(data, file, separators=(',', ':'))
+            os.replace(temp_file, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Could not save media manifest: {str(e)}")
+    
+    def get(self, media_file):
+        """Record for a file named as in Questions.txt (relative to Media_Data), or None if it isn't there"""
+        return self.entries.get(self._key(media_file))
+    
+    def of_type(self, media_files, media_type):
+        return [media_file for media_file in media_files
+                if (self.get(media_file) or {}).get('type') == media_type]
+
+VIDEO_BOX = (400, 225)  # Size videos are shown at in the form
+SPRITE_FRAMES = 20  # Frames in each video's scrub-preview sprite sheet
+
+def fit_frame(image, box):
+    """A cv2 image scaled down (never up) to fit inside box"""
+    height, width = image.shape[:2]
+    scale = min(box[0] / width, box[1] / height, 1)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    return image
+
+def extract_video_previews(path, poster_file, sprite_file, frames=SPRITE_FRAMES, box=VIDEO_BOX):
+    """Write a poster frame and a sprite sheet of `frames` evenly spaced tiles for a video
+    
+    Runs in a worker process. The poster is taken a tenth of the way in, past any
+    fade from black, and the tiles are half the box size, letterboxed side by side in
+    one row. Both are written as PPM, which PhotoImage reads directly.
+    """
+    capture = cv2.VideoCapture(path)
+    try:
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        def frame_at(position):
+            capture.set(cv2.CAP_PROP_POS_FRAMES, position)
+            ok, image = capture.read()
+            return image if ok else None
+        
+        poster = frame_at(frame_count // 10) if frame_count > 0 else None
+        if poster is None:
+            poster = frame_at(0)
+        if poster is None:
+            raise ValueError(f"Could not read any frames from {path}")
+        
+        positions = [int(frame_count * (i + 0.5) / frames) for i in range(frames)] if frame_count > 0 else [0]
+        tile_width, tile_height = box[0] // 2, box[1] // 2
+        sprite = np.zeros((tile_height, tile_width * len(positions), 3), np.uint8)
+        for index, position in enumerate(positions):
+            image = frame_at(position)
+            if image is None:
+                continue
+            image = fit_frame(image, (tile_width, tile_height))
+            top = (tile_height - image.shape[0]) // 2
+            left = index * tile_width + (tile_width - image.shape[1]) // 2
+            sprite[top:top + image.shape[0], left:left + image.shape[1]] = image
+    finally:
+        capture.release()
+    
+    for image, target in ((fit_frame(poster, box), poster_file), (sprite, sprite_file)):
+        temp_file = f"{target}.{os.getpid()}.tmp.ppm"
+        if not cv2.imwrite(temp_file, image):
+            raise OSError(f"Could not write {target}")
+        os.replace(temp_file, target)  # Readers never see a half-written file
+    return poster_file, sprite_file
+
+class VideoPreviewLoader:
+    """Poster frames and scrub sprite sheets for videos, cached on disk and made in worker processes
+    
+    Cache files are named after the video's path, mtime and size, so an edited video
+    gets new previews. Cache hits are reported straight away; misses go to
+    extract_video_previews in a process pool (decoding is CPU-bound, so threads would
+    fight the form for the GIL) and come back to the Tk thread through a queue polled
+    with after(), like ImageLoader.
+    """
+    def __init__(self, root, folder, workers=None):
+        self.root = root
+        self.folder = folder
+        self.workers = workers or max(1, min(2, (os.cpu_count() or 2) - 1))
+        self.pool = None  # Started on the first miss
+        self.results = queue.Queue()
+        self.pending = 0
+        self.polling = False
+        os.makedirs(folder, exist_ok=True)
+    
+    def _files(self, path, record=None):
+        if record is None:
+            stat = os.stat(path)
+            record = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+        raw = f"{os.path.abspath(path)}|{record['mtime_ns']}|{record['size']}|{SPRITE_FRAMES}|{VIDEO_BOX}"
+        stem = os.path.join(self.folder, hashlib.sha1(raw.encode('utf-8')).hexdigest())
+        return stem + ".poster.ppm", stem + ".sprite.ppm"
+    
+    def request(self, path, on_ready, record=None):
+        """Call on_ready((poster file, sprite file), error) on the Tk thread once the previews exist
+        
+        Cached previews are reported before this returns, so callers must be ready for that.
+        
+        record is the video's MediaManifest entry, which saves a stat of the file.
+        """
+        try:
+            poster_file, sprite_file = self._files(path, record)
+        except OSError as e:
+            on_ready(None, e)
+            return
+        if os.path.exists(poster_file) and os.path.exists(sprite_file):
+            on_ready((poster_file, sprite_file), None)
+            return
+        if self.pool is None:
+            # Spawned, not forked: a forked child would inherit Tk and the worker threads mid-call
+            self.pool = concurrent.futures.ProcessPoolExecutor(self.workers,
+                                                               mp_context=multiprocessing.get_context("spawn"))
+        future = self.pool.submit(extract_video_previews, path, poster_file, sprite_file)
+        future.add_done_callback(lambda done: self.results.put((on_ready, done)))
+        self.pending += 1
+        if not self.polling:
+            self.polling = True
+            self.root.after(100, self._poll)
+    
+    def _poll(self):
+        while True:
+            try:
+                on_ready, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if future.cancelled():
+                continue
+            error = future.exception()
+            try:
+                on_ready(None if error else future.result(), error)
+            except Exception as e:
+                print(f"Could not show video preview: {str(e)}")
+        if self.pending:
+            self.root.after(100, self._poll)
+        else:
+            self.polling = False
+    
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+class InlineVideoPlayer:
+    """A video played inside the form, with frames decoded by cv2 on a worker thread
+    
+    The worker scales each frame to fit BOX and turns it straight into PPM bytes (a
+    header plus the RGB pixels), which Tk's PhotoImage reads without a PIL round
+    trip. Frames are handed over through a queue of at most BUFFER_FRAMES, so memory
+    stays flat and decoding never runs far ahead. The Tk side shows each frame at its
+    timestamp against a wall clock and skips frames that are already late, so a slow
+    machine drops frames instead of drifting. cv2 doesn't decode sound, so
+    double-clicking the picture opens the video in VLC instead.
+    
+    While stopped it shows the video's poster frame, and moving the mouse across the
+    picture scrubs through its sprite sheet (both from VideoPreviewLoader).
+    """
+    BOX = VIDEO_BOX
+    BUFFER_FRAMES = 4
+    
+    def __init__(self, app, parent, path, record=None):
+        self.app = app
+        self.path = path
+        self.frame = tk.Frame(parent)
+        screen = tk.Frame(self.frame, width=self.BOX[0], height=self.BOX[1], bg="black")
+        screen.pack_propagate(False)
+        screen.pack()
+        self.idle_text = f"Video: {os.path.basename(path)}\n(Play to watch here, double-click to open with sound)"
+        self.label = tk.Label(screen, text=self.idle_text, bg="black", fg="white", cursor="hand2")
+        self.label.pack(expand=True, fill="both")
+        self.label.bind("<Double-Button-1>", lambda e: app.play_video(path))
+        controls = tk.Frame(self.frame)
+        controls.pack(pady=(5, 0))
+        self.play_button = tk.Button(controls, text="Play", width=6, command=self.toggle)
+        self.play_button.pack(side="left")
+        tk.Button(controls, text="Stop", width=6, command=self.stop).pack(side="left", padx=(5, 0))
+        self.frame.bind("<Destroy>", lambda e: self.stop() if e.widget is self.frame else None)
+        self.label.bind("<Motion>", self._scrub)
+        self.label.bind("<Leave>", lambda e: self._show_idle())
+        
+        self.poster = None
+        self.sprite_file = None
+        self.sprite = None
+        self.scrub_photo = None
+        self.scrub_index = None
+        
+        self.photo = None
+        self.frames = None
+        self.stopping = None
+        self.playing = False
+        self.paused_at = None
+        self.clock_start = 0.0
+        self.next_frame = None  # (timestamp, ppm) taken from the queue but not yet due
+        self.tick = None
+        self.dropped = 0
+        
+        # Last, as a cached poster is shown before request() returns
+        if app.video_previews is not None:
+            app.video_previews.request(path, self._on_previews, record)
+    
+    def toggle(self):
+        if not self.playing:
+            self.app.stop_media()
+            self.play()
+        elif self.paused_at is None:
+            self.paused_at = time.monotonic() - self.clock_start
+            self.play_button.config(text="Play")
+        else:
+            self.clock_start = time.monotonic() - self.paused_at
+            self.paused_at = None
+            self.play_button.config(text="Pause")
+            self._tick()
+    
+    def play(self):
+        self.frames = queue.Queue(self.BUFFER_FRAMES)
+        self.stopping = threading.Event()
+        threading.Thread(target=self._decode, args=(self.frames, self.stopping), daemon=True).start()
+        self.playing = True
+        self.paused_at = None
+        self.next_frame = None
+        self.dropped = 0
+        self.clock_start = time.monotonic()
+        self.app.inline_video = self
+        self.play_button.config(text="Pause")
+        self.label.config(text="Loading...")
+        self._tick()
+    
+    def _decode(self, frames, stopping):
+        """Worker thread: decode, scale and convert frames until the end or stop(); must not touch Tk"""
+        def hand_over(item):
+            while not stopping.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+        
+        capture = cv2.VideoCapture(self.path)
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS) or 25
+            index = 0
+            while not stopping.is_set():
+                ok, image = capture.read()
+                if not ok:
+                    break
+                image = cv2.cvtColor(fit_frame(image, self.BOX), cv2.COLOR_BGR2RGB)
+                ppm = b"P6 %d %d 255\n" % (image.shape[1], image.shape[0]) + image.tobytes()
+                hand_over((index / fps, ppm))
+                index += 1
+        finally:
+            capture.release()
+            hand_over((None, None))  # End of video
+    
+    def _tick(self):
+        """Show the newest frame that is due, skipping late ones, and wait for the next"""
+        self.tick = None
+        if not self.playing or self.paused_at is not None:
+            return
+        now = time.monotonic() - self.clock_start
+        due = None
+        while True:
+            if self.next_frame is None:
+                try:
+                    self.next_frame = self.frames.get_nowait()
+                except queue.Empty:
+                    break
+            timestamp, ppm = self.next_frame
+            if timestamp is None:
+                self.stop()
+                return
+            if timestamp > now:
+                break
+            if due is not None:
+                self.dropped += 1
+            due = ppm
+            self.next_frame = None
+        if due is not None:
+            if self.photo is None:
+                self.photo = tk.PhotoImage(data=due, format='PPM')
+                self.label.config(image=self.photo, text="")
+            else:
+                self.photo.configure(data=due, format='PPM')
+        delay = 10 if self.next_frame is None else max(1, int((self.next_frame[0] - now) * 1000))
+        self.tick = self.frame.after(delay, self._tick)
+    
+    def stop(self):
+        if self.stopping is not None:
+            self.stopping.set()
+        if self.tick is not None:
+            self.frame.after_cancel(self.tick)
+            self.tick = None
+        self.playing = False
+        self.paused_at = None
+        self.next_frame = None
+        if self.app.inline_video is self:
+            self.app.inline_video = None
+        if self.frame.winfo_exists():
+            self.play_button.config(text="Play")
+            self._show_idle()
+        self.photo = None
+    
+    def _on_previews(self, files, error):
+        if error is not None:
+            print(f"Could not make previews for {self.path}: {str(error)}")
+            return
+        if not self.frame.winfo_exists():
+            return
+        self.poster = tk.PhotoImage(file=files[0])
+        self.sprite_file = files[1]
+        self._show_idle()
+    
+    def _show_idle(self):
+        if self.playing or not self.label.winfo_exists():
+            return
+        self.scrub_index = None
+        if self.poster is not None:
+            self.label.config(image=self.poster, text="")
+        else:
+            self.label.config(image="", text=self.idle_text)
+    
+    def _scrub(self, event):
+        """Show the sprite sheet tile for where the mouse is across the picture"""
+        if self.playing or self.sprite_file is None:
+            return
+        tile_width, tile_height = self.BOX[0] // 2, self.BOX[1] // 2
+        if self.sprite is None:
+            self.sprite = tk.PhotoImage(file=self.sprite_file)  # Only read once someone hovers
+            self.scrub_photo = tk.PhotoImage(width=tile_width * 2, height=tile_height * 2)
+        tiles = max(1, self.sprite.width() // tile_width)
+        index = min(tiles - 1, max(0, event.x * tiles // max(1, self.label.winfo_width())))
+        if index == self.scrub_index:
+            return
+        self.scrub_index = index
+        # Tk's photo copy takes a source rectangle and a zoom, so no pixels pass through Python
+        self.scrub_photo.tk.call(self.scrub_photo, 'copy', self.sprite, '-from', index * tile_width, 0,
+                                 (index + 1) * tile_width, tile_height, '-zoom', 2, 2)
+        self.label.config(image=self.scrub_photo, text="")
+
 class FormApplication:
-    def __init__(self, root, questions_file, csv_file, description_file="Description.txt", window_width=800, window_height=600):
+    def __init__(self, root, questions_file, csv_file, description_file="Description.txt", window_width=800, window_height=600,
+                 virtualize_threshold=200, remote_timeout=(5, 30), upload_batch_size=1,
+                 csv_commit_rows=10, csv_commit_interval=1.0, storage_backend="csv",
+                 csv_rotate_bytes=0, csv_rotate_daily=False, archive_compression="gzip"):
         self.root = root
         self.root.title("Internal Form Organizer")
         self.root.geometry(f"{window_width}x{window_height}")
@@ -28,6 +3169,9 @@ class FormApplication:
         # Create path for Media_Data folder
         self.media_folder = os.path.join(script_dir, "Media_Data")
         
+        # Create path for the cache folder (thumbnails and other derived data, safe to delete)
+        self.cache_folder = os.path.join(script_dir, "Cache")
+        
         # Create path for VLC Portable folder
         self.vlc_folder = os.path.join(script_dir, "VLCPortable")
         
@@ -40,6 +3184,11 @@ class FormApplication:
         self.csv_file = os.path.join(self.data_folder, csv_file)
         self.description_file = os.path.join(self.data_folder, description_file)
         self.remote_link_file = os.path.join(self.data_folder, "Remote_Link.txt")
+        self.outbox_file = os.path.join(self.data_folder, "Outbox.sqlite3")
+        self.sqlite_file = os.path.join(self.data_folder, "Responses.sqlite3")
+        
+        # Parsed questions are cached here and reused until Questions.txt changes
+        self.schema_cache_file = os.path.join(self.cache_folder, "Form_Schema.json")
         
         # Print file locations to console
         print("\nFile locations:")
@@ -47,7 +3196,9 @@ class FormApplication:
         print(f"Responses CSV: {self.csv_file}")
         print(f"Description file: {self.description_file}")
         print(f"Remote link file: {self.remote_link_file}")
-        print(f"VLC folder: {self.vlc_folder}\n")
+        print(f"Upload outbox: {self.outbox_file}")
+        print(f"VLC folder: {self.vlc_folder}")
+        print(f"Cache folder: {self.cache_folder}\n")
         
         self.questions = []
         self.question_modifiers = []
@@ -56,6 +3207,38 @@ class FormApplication:
         self.checkboxes = []
         self.checkbox_vars = []
         
+        # Forms with at least this many items only build widgets for the rows in view
+        self.virtualize_threshold = virtualize_threshold
+        self.virtualized = False
+        self.answers = []  # Answer model used by the virtualized form
+        
+        # Submissions are saved off the Tk thread so a slow disk or server never freezes the form
+        self.remote_timeout = remote_timeout  # (connect, read) seconds for web links
+        self.save_worker = BackgroundWorker(self.root)
+        self.pending_saves = 0
+        self.outbox = Outbox(self.outbox_file, timeout=remote_timeout, batch_size=upload_batch_size)
+        # Stores for Remote_Link.txt paths; a shared directory gets this process's own shard file
+        host = re.sub(r'[^A-Za-z0-9_-]', '_', socket.gethostname())
+        self.shard_name = f"Responses-{host}-{os.getpid()}.csv"
+        self.remote_stores = {}
+        
+        # Local responses go to Responses.csv, or to Responses.sqlite3 with storage_backend="sqlite"
+        if storage_backend == "sqlite":
+            self.response_store = SqliteResponseStore(self.sqlite_file, commit_rows=csv_commit_rows,
+                                                      commit_interval=csv_commit_interval)
+        else:
+            self.response_store = CsvResponseStore(self.csv_file, commit_rows=csv_commit_rows,
+                                                   commit_interval=csv_commit_interval,
+                                                   rotate_bytes=csv_rotate_bytes, rotate_daily=csv_rotate_daily,
+                                                   compression=archive_compression)
+        
+        # Images are decoded off the Tk thread and swapped in when ready
+        self.image_loader = ImageLoader(self.root, ThumbnailCache(os.path.join(self.cache_folder, "Thumbnails")))
+        
+        # Every media lookup is answered from one scan of Media_Data, listing only folders that changed
+        self.media = MediaManifest(self.media_folder, os.path.join(self.cache_folder, "Media_Manifest.json"))
+        self.media.refresh()
+        
         # Create default files if they don't exist
         self.create_default_files()
         
@@ -63,15 +3246,68 @@ class FormApplication:
         if not self.load_questions():
             return  # Stop initialization if questions couldn't be loaded
         self.load_description()
+        # A file copied over in place isn't seen by refresh(), so check the ones the form shows
+        self.media.verify([item_text for item_type, item_text, _ in self.form_items if item_type == 'media'])
+        
+        # Reference lists for <lookup=...> questions, filled in by load_lookups
+        self.lookups = {}
+        
+        # Audio plays in-process; audio_scales holds each audio item's position slider
+        self.audio = AudioPlayer()
+        self.audio_scales = {}
+        self.audio_update = None  # Pending after() id of _update_audio_position
+        self.vlc = VlcPlayer(self.vlc_path())
+        self.inline_video = None  # InlineVideoPlayer currently playing, if any
+        self.video_previews = VideoPreviewLoader(self.root, os.path.join(self.cache_folder, "Video_Previews")) \
+            if cv2 is not None and np is not None else None
         
         # Create the form (this should be after all initializations)
         self.create_form()
+        self.load_lookups()
+        
+        # Running per-question statistics, caught up on the save worker with anything saved since the last run
+        self.stats = ResponseStats(os.path.join(self.cache_folder, "Response_Stats.json"),
+                                   self.csv_file if storage_backend == "csv" else None,
+                                   sqlite_path=self.sqlite_file if storage_backend == "sqlite" else None,
+                                   **self._stats_settings())
+        self.stats_ready = False  # The dashboard copies the statistics, so it waits for this
+        self.save_worker.run(self.stats.catch_up, self._on_stats_ready)
+        if storage_backend == "csv":
+            self.save_worker.run(self.response_store.ensure_index,
+                                 lambda _, error: error and print(f"Could not index {self.csv_file}: {error}"))
+        
+        # Answers to <unique> questions are checked against an index of all earlier responses,
+        # opened (and first built from them if needed) on the save worker
+        self.unique_index = None
+        self.unique_index_failed = False  # Then responses are saved without the duplicate check
+        unique_questions = [question for question, modifiers in zip(self.questions, self.question_modifiers)
+                            if 'unique' in modifiers]
+        if unique_questions:
+            self.save_worker.run(lambda: self._open_unique_index(unique_questions), self._on_unique_index_ready)
         
         # Bind the resize event
         self.root.bind('<Configure>', self.on_window_resize)
         
-        # Initialize pygame mixer for audio
-        pygame.mixer.init()
+        # Don't let the window close silently while responses are still being saved
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Ctrl+D opens live statistics for the operator (kept off screen so respondents don't see it).
+        # Ctrl+D in an answer box just edits it, so clicking a blank part of the form takes focus off them.
+        self.dashboard = None
+        self.dashboard_worker = None
+        self.root.bind('<Control-d>', self.open_dashboard)
+        for widget in (self.main_frame, self.canvas):
+            widget.bind('<Button-1>', lambda event: self.canvas.focus_set(), add="+")
+        
+        # Initialize pygame mixer for audio (a small buffer keeps click-to-sound latency low)
+        pygame.mixer.init(buffer=512)
+        media_files = [item_text for item_type, item_text, _ in self.form_items if item_type == 'media']
+        self.audio.preload([os.path.join(self.media_folder, media_file)
+                            for media_file in self.media.of_type(media_files, 'audio')])
+        
+        # Videos play in one shared VLC process, started now so the first video opens quickly
+        if self.media.of_type(media_files, 'video') and os.path.exists(self.vlc_path()):
+            self.vlc.start()
         
         # Store currently playing media
         self.currently_playing = None
@@ -132,29 +3368,20 @@ Do you agree to the terms?<checkmark>"""
     
     def load_questions(self):
         try:
-            with open(self.questions_file, 'r') as file:
-                content = file.read()
-                # Split by lines and remove empty lines
-                lines = [line.strip() for line in content.split('\n') if line.strip()]
-                
-                self.form_items = []  # Combined list of questions and media items with their order preserved
-                
-                current_question = ""
-                for line in lines:
-                    # If the line starts with whitespace, it's part of the previous question
-                    if not line.startswith((' ', '\t')) and current_question:
-                        # Process the accumulated question
-                        self._process_question_or_media(current_question)
-                        current_question = line
-                    else:
-                        if current_question:
-                            current_question += " " + line
-                        else:
-                            current_question = line
-                
-                # Process the last question
-                if current_question:
-                    self._process_question_or_media(current_question)
+            # Unchanged question files are loaded from the compiled schema without any text parsing
+            stat = os.stat(self.questions_file)
+            cached = self._read_schema_cache()
+            if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                self.form_items = [tuple(item) for item in cached['items']]
+            else:
+                digest = self._hash_file(self.questions_file)
+                if cached and cached['hash'] == digest:
+                    # Only the timestamp changed (e.g. the file was copied or re-saved)
+                    self.form_items = [tuple(item) for item in cached['items']]
+                else:
+                    with open(self.questions_file, 'r') as file:
+                        self._parse_questions(file)
+                self._write_schema_cache(stat, digest)
                     
             if not self.form_items:
                 messagebox.showerror("Error", "No items found in the questions file.")
@@ -162,28 +3389,147 @@ Do you agree to the terms?<checkmark>"""
                 return False
                 
             return True
+        
+        except QuestionFormatError as e:
+            print(str(e))
+            messagebox.showerror("Questions File Error", str(e))
+            self.root.destroy()
+            return False
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load questions: {str(e)}")
             self.root.destroy()
             return False
+    
+    def _hash_file(self, path):
+        """SHA-256 of a file, read in fixed-size chunks"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _parse_questions(self, lines):
+        """Parse the questions file line by line into self.form_items in a single pass
+        
+        Blank lines are ignored and a line starting with a space or tab continues the
+        item above it. Only the lines of the current item are held in memory.
+        """
+        self.form_items = []  # Combined list of questions and media items with their order preserved
+        problems = []
+        
+        current_parts = []  # (line number, raw line) of the item being accumulated
+        for line_number, line in enumerate(lines, 1):
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+            
+            # If the line starts with whitespace, it's part of the previous question
+            if line.startswith((' ', '\t')) and current_parts:
+                current_parts.append((line_number, line))
+            else:
+                if current_parts:
+                    # Process the accumulated question
+                    self._process_question_or_media(current_parts, problems)
+                current_parts = [(line_number, line)]
+        
+        # Process the last question
+        if current_parts:
+            self._process_question_or_media(current_parts, problems)
+        
+        if problems:
+            raise QuestionFormatError(os.path.basename(self.questions_file), problems)
+    
+    def _read_schema_cache(self):
+        """Return the compiled schema cache if it belongs to this questions file, else None"""
+        try:
+            with open(self.schema_cache_file, 'r') as file:
+                cached = json.load(file)
+            if cached.get('version') == SCHEMA_CACHE_VERSION and cached.get('source') == self.questions_file:
+                return cached
+        except (OSError, ValueError):
+            pass
+        return None
+    
+    def _write_schema_cache(self, stat, digest):
+        """Save the parsed form items along with what is needed to tell if they are stale"""
+        cached = {
+            "version": SCHEMA_CACHE_VERSION,
+            "source": self.questions_file,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": digest,
+            "items": self.form_items
+        }
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            temp_file = self.schema_cache_file + ".tmp"
+            with open(temp_file, 'w') as file:
+                json.dump(cached, file)
+            os.replace(temp_file, self.schema_cache_file)
+        except OSError as e:
+            print(f"Could not write schema cache: {str(e)}")
 
-    def _process_question_or_media(self, text):
-        """Process a line as either a question or media item"""
+    def _process_question_or_media(self, parts, problems):
+        """Process the lines of one item as either a question or media item"""
         modifiers = []
-        item_text = text
+        item_text = " ".join(line.strip() for _, line in parts)
         
         # Extract modifiers at the end
-        mod_match = re.search(r'\s*<([^>]+)>\s*$', item_text)
+        mod_match = MODIFIER_PATTERN.search(item_text)
         if mod_match:
-            modifiers = [m.strip().lower() for m in mod_match.group(1).split(',')]
-            item_text = re.sub(r'\s*<[^>]+>\s*$', '', item_text).strip()
+            entries = split_modifiers(mod_match.group(1))
+            modifiers = [modifier for modifier, _ in entries]
+            item_text = item_text[:mod_match.start()].strip()
+            self._check_modifiers(parts, entries, problems)
+        else:
+            unclosed = UNCLOSED_MODIFIER_PATTERN.search(item_text)
+            if unclosed:
+                line_number, column = self._locate(parts, '<')
+                problems.append((line_number, column, f"modifier '{unclosed.group(0)}' is missing its closing '>'"))
         
         # Store item with its type (media or question)
         if 'media' in modifiers:
             self.form_items.append(('media', item_text, modifiers))
         else:
             self.form_items.append(('question', item_text, modifiers))
+    
+    def _check_modifiers(self, parts, entries, problems):
+        """Record every empty, unknown or unusable entry in a <...> modifier list"""
+        line_number, column = self._locate(parts, '<')
+        column += 1  # First character after "<"
+        for modifier, offset in entries:
+            name, _, value = modifier.partition('=')
+            problem = None
+            if not name:
+                problem = "empty modifier"
+            elif name not in KNOWN_MODIFIERS:
+                problem = f"unknown modifier '{modifier}' (expected one of: {', '.join(sorted(KNOWN_MODIFIERS))})"
+            elif name == 'regex':
+                try:
+                    re.compile(value)
+                except re.error as e:
+                    problem = f"invalid regex '{value}': {str(e)}"
+            elif name == 'range':
+                try:
+                    parse_range(value)
+                except ValueError as e:
+                    problem = str(e)
+            elif name == 'lookup':
+                if not value:
+                    problem = "lookup needs a file name, like <lookup=Members.csv>"
+                elif not os.path.isfile(os.path.join(self.data_folder, value)):
+                    problem = f"lookup file '{value}' was not found in the Change_Form folder"
+            if problem:
+                problems.append((line_number, column + offset, problem))
+    
+    def _locate(self, parts, marker):
+        """Line number and 1-based column of the last marker in an item's lines"""
+        for line_number, line in reversed(parts):
+            index = line.rfind(marker)
+            if index != -1:
+                return line_number, index + 1
+        return parts[-1][0], 1
         
     def load_description(self):
         try:
@@ -214,6 +3560,15 @@ Do you agree to the terms?<checkmark>"""
                                     anchor="w")
             description_label.pack(pady=(0, 20), fill="x")
         
+        # Status line for saves in progress and the upload queue (packed first so it keeps its place at the bottom)
+        status_frame = tk.Frame(self.main_frame)
+        status_frame.pack(side="bottom", fill="x", pady=(10, 0))
+        self.status_label = tk.Label(status_frame, text="", anchor="w", fg="gray25")
+        self.status_label.pack(side="left", fill="x", expand=True)
+        self.outbox_label = tk.Label(status_frame, text="", anchor="e", fg="gray25")
+        self.outbox_label.pack(side="right")
+        self._refresh_outbox_status()
+        
         # Create canvas with scrollbar
         self.canvas = tk.Canvas(self.main_frame, highlightthickness=0)
         self.scrollbar = tk.Scrollbar(self.main_frame, 
@@ -224,6 +3579,24 @@ Do you agree to the terms?<checkmark>"""
         self.scrollbar.pack(side="right", fill="y")
         self.canvas.pack(side="left", fill="both", expand=True)
         
+        # Reset form element lists
+        self.entries = []
+        self.checkboxes = []
+        self.checkbox_vars = []
+        self.questions = []
+        self.question_modifiers = []
+        self.answers = []
+        
+        # Validators are compiled once per question here rather than on every submit
+        self.validators = [self.compile_validator(modifiers)
+                           for item_type, _, modifiers in self.form_items if item_type == 'question']
+        
+        # Large forms only keep the rows in view alive (see _create_virtual_form)
+        self.virtualized = len(self.form_items) >= self.virtualize_threshold
+        if self.virtualized:
+            self._create_virtual_form()
+            return
+        
         # Create scrollable frame with minimum width
         self.scrollable_frame = tk.Frame(self.canvas, width=600)
         self.canvas_frame = self.canvas.create_window((0, 0), 
@@ -241,13 +3614,6 @@ Do you agree to the terms?<checkmark>"""
         # Configure grid weights
         self.scrollable_frame.columnconfigure(0, weight=1)
         
-        # Reset form element lists
-        self.entries = []
-        self.checkboxes = []
-        self.checkbox_vars = []
-        self.questions = []
-        self.question_modifiers = []
-        
         row_counter = 0
         
         # Create form elements with wider fields
@@ -279,36 +3645,15 @@ Do you agree to the terms?<checkmark>"""
                 entry_frame.columnconfigure(0, weight=1)
                 row_counter += 1
                 
-                if 'checkmark' in modifiers:
-                    var = tk.BooleanVar(value=False)
-                    checkbox = tk.Checkbutton(entry_frame, variable=var)
-                    checkbox.grid(row=0, column=0, sticky="w")
-                    self.checkboxes.append(checkbox)
+                widget, var = self._create_input_widget(entry_frame, modifiers)
+                if lookup_source(modifiers):
+                    LookupDropdown(self, widget, lambda name=lookup_source(modifiers): self.lookups.get(name))
+                if var is not None:
+                    self.checkboxes.append(widget)
                     self.checkbox_vars.append(var)
                     self.entries.append(None)
-                elif 'long' in modifiers:
-                    # Wider text area (60 characters wide, 5 lines tall)
-                    entry = Text(entry_frame, 
-                            height=5, 
-                            width=60,
-                            wrap=tk.WORD, 
-                            padx=5, 
-                            pady=5)
-                    entry.grid(row=0, 
-                            column=0, 
-                            sticky="nsew", 
-                            padx=(0, 20))
-                    self.entries.append(entry)
                 else:
-                    # Wider entry field (60 characters wide)
-                    entry = tk.Entry(entry_frame, 
-                                width=60)
-                    entry.grid(row=0, 
-                            column=0, 
-                            sticky="ew", 
-                            ipady=2, 
-                            padx=(0, 20))
-                    self.entries.append(entry)
+                    self.entries.append(widget)
         
         # Submit button
         self.submit_button = tk.Button(self.scrollable_frame, 
@@ -325,176 +3670,458 @@ Do you agree to the terms?<checkmark>"""
         # Initial configuration
         self.root.update_idletasks()
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    
+    def _create_input_widget(self, parent, modifiers):
+        """Create the input widget for a question, returning (widget, checkbox variable or None)"""
+        if 'checkmark' in modifiers:
+            var = tk.BooleanVar(value=False)
+            checkbox = tk.Checkbutton(parent, variable=var)
+            checkbox.grid(row=0, column=0, sticky="w")
+            return checkbox, var
+        elif 'long' in modifiers:
+            # Wider text area (60 characters wide, 5 lines tall)
+            entry = Text(parent, 
+                    height=5, 
+                    width=60,
+                    wrap=tk.WORD, 
+                    padx=5, 
+                    pady=5)
+            entry.grid(row=0, 
+                    column=0, 
+                    sticky="nsew", 
+                    padx=(0, 20))
+            return entry, None
+        else:
+            # Wider entry field (60 characters wide)
+            entry = tk.Entry(parent, 
+                        width=60)
+            entry.grid(row=0, 
+                    column=0, 
+                    sticky="ew", 
+                    ipady=2, 
+                    padx=(0, 20))
+            return entry, None
+    
+    def _question_kind(self, modifiers):
+        """Name the kind of input a question uses, so pooled rows can be shared between questions"""
+        if 'checkmark' in modifiers:
+            return 'checkmark'
+        elif 'long' in modifiers:
+            return 'long'
+        return 'entry'
+    
+    def _create_virtual_form(self):
+        """Lay out every row by height up front, but only build widgets for rows near the viewport"""
+        self.virtual_overscan = 5  # Extra rows kept alive above and below the viewport
+        self.virtual_rows = []  # (kind, question index or (media_file, modifiers)) per row
+        self.row_tops = []  # Canvas y of each row, ascending for bisect lookups
+        self.live_rows = {}  # Row index -> PooledRow (or media frame) currently shown
+        self.row_pool = {}  # Kind -> list of hidden PooledRows ready for reuse
+        self.virtual_refresh_pending = False
+        
+        # Measure one prototype row per kind; the prototypes become the first pooled rows
+        row_heights = {}
+        for kind in ('entry', 'long', 'checkmark'):
+            pooled_row = PooledRow(self, kind)
+            self.root.update_idletasks()
+            row_heights[kind] = pooled_row.frame.winfo_reqheight()
+            self.row_pool[kind] = [pooled_row]
+        
+        y = 0
+        for item_type, item_text, modifiers in self.form_items:
+            if item_type == 'media':
+                row = ('media', (item_text, modifiers))
+                height = self._media_row_height(item_text)
+            else:
+                question_index = len(self.questions)
+                self.questions.append(item_text)
+                self.question_modifiers.append(modifiers)
+                self.answers.append(False if 'checkmark' in modifiers else "")
+                row = (self._question_kind(modifiers), question_index)
+                height = row_heights[row[0]]
+            self.virtual_rows.append(row)
+            self.row_tops.append(y)
+            y += height
+        
+        # Submit button sits below the last row
+        self.submit_button = tk.Button(self.canvas, 
+                                    text="Submit", 
+                                    command=self.submit_form)
+        self.canvas.create_window((0, y + 20), window=self.submit_button, anchor="nw")
+        self.root.update_idletasks()
+        self.virtual_height = y + 40 + self.submit_button.winfo_reqheight()
+        
+        self.canvas.configure(scrollregion=(0, 0, 600, self.virtual_height),
+                              yscrollcommand=self._on_virtual_yview)
+        self.canvas.bind("<Configure>", self._on_virtual_canvas_configure)
+        self._refresh_virtual_rows()
+    
+    def _media_row_height(self, media_file):
+        """Height of a media row, from the media manifest (nothing is decoded or read)"""
+        record = self.media.get(media_file)
+        if record is None:
+            return 60
+        if record['type'] == 'image':
+            try:
+                return self._thumbnail_size(record)[1] + 20
+            except ValueError:
+                pass
+        if record['type'] == 'video' and cv2 is not None:
+            return InlineVideoPlayer.BOX[1] + 60
+        return 60
+    
+    def _thumbnail_size(self, record, max_size=(400, 400)):
+        """Size an image will have once shrunk to fit max_size, from its media manifest entry"""
+        width, height = record.get('width'), record.get('height')
+        if not width or not height:
+            raise ValueError(record.get('error') or "Could not read the image size")
+        scale = min(max_size[0] / width, max_size[1] / height, 1)
+        return max(int(width * scale), 1), max(int(height * scale), 1)
+    
+    def _on_virtual_yview(self, first, last):
+        """Keep the scrollbar in sync and rebind rows whenever the view moves"""
+        self.scrollbar.set(first, last)
+        self._schedule_virtual_refresh()
+    
+    def _on_virtual_canvas_configure(self, event):
+        """Stretch live rows to the canvas width and fill any newly exposed space"""
+        width = max(event.width, 600)
+        for live in self.live_rows.values():
+            self.canvas.itemconfig(live.window_id, width=width)
+        self._schedule_virtual_refresh()
+    
+    def _schedule_virtual_refresh(self):
+        """Coalesce bursts of scroll events into one refresh"""
+        if not self.virtual_refresh_pending:
+            self.virtual_refresh_pending = True
+            self.root.after_idle(self._refresh_virtual_rows)
+    
+    def _refresh_virtual_rows(self):
+        """Release rows that left the viewport and bind pooled rows to the ones that entered it"""
+        self.virtual_refresh_pending = False
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first = max(bisect.bisect_right(self.row_tops, top) - 1 - self.virtual_overscan, 0)
+        last = min(bisect.bisect_left(self.row_tops, bottom) + self.virtual_overscan, len(self.virtual_rows))
         
-    def _add_media_item(self, media_file, modifiers, row_counter):
+        for index in [i for i in self.live_rows if not first <= i < last]:
+            self._release_row(index)
+        for index in range(first, last):
+            if index not in self.live_rows:
+                self._bind_row(index)
+    
+    def _bind_row(self, index):
+        """Show row index, reusing a pooled row of the same kind when one is free"""
+        kind, payload = self.virtual_rows[index]
+        width = max(self.canvas.winfo_width(), 600)
+        if kind == 'media':
+            # Media rows each own their image, so they are rebuilt rather than pooled
+            live = PooledRow(self, 'media')
+            media_file, modifiers = payload
+            # Decode rows nearest the top of the viewport first
+            priority = abs(self.row_tops[index] - self.canvas.canvasy(0))
+            self._add_media_item(media_file, modifiers, 0, parent=live.frame, priority=priority)
+        else:
+            pool = self.row_pool.get(kind)
+            live = pool.pop() if pool else PooledRow(self, kind)
+            live.load(payload, self.questions[payload], self.answers[payload])
+        self.canvas.coords(live.window_id, 0, self.row_tops[index])
+        self.canvas.itemconfig(live.window_id, width=width, state="normal")
+        self.live_rows[index] = live
+    
+    def _release_row(self, index):
+        """Save the answer held by a live row back to the model and return it to the pool"""
+        live = self.live_rows.pop(index)
+        if live.kind == 'media':
+            self.canvas.delete(live.window_id)
+            live.frame.destroy()
+            return
+        if self.root.focus_get() is live.widget:
+            self.canvas.focus_set()
+        self.answers[live.question_index] = live.read()
+        self.canvas.itemconfig(live.window_id, state="hidden")
+        self.row_pool[live.kind].append(live)
+    
+    def _sync_live_rows_out(self):
+        """Copy the answers held by on-screen rows into the answer model"""
+        for live in self.live_rows.values():
+            if live.kind != 'media':
+                self.answers[live.question_index] = live.read()
+    
+    def _add_media_item(self, media_file, modifiers, row_counter, parent=None, priority=None):
         """Add a media item to the form"""
+        parent = parent or self.scrollable_frame
         media_path = os.path.join(self.media_folder, media_file)
+        record = self.media.get(media_file)
         
-        if os.path.exists(media_path):
+        if record is not None:
             try:
-                if media_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    # Display image
-                    img = Image.open(media_path)
-                    # Maintain aspect ratio while limiting size
+                if record['type'] == 'image':
+                    # Reserve the final size now; the image is decoded on a worker thread
                     max_size = (400, 400)
-                    img.thumbnail(max_size, Image.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
-                    
-                    media_label = tk.Label(self.scrollable_frame, image=photo)
-                    media_label.image = photo  # Keep reference
+                    width, height = self._thumbnail_size(record, max_size)
+                    placeholder = tk.PhotoImage(width=width, height=height)
+                    media_label = tk.Label(parent, image=placeholder, 
+                                        text="Loading image...", compound="center")
+                    media_label.image = placeholder  # Keep reference
                     media_label.grid(row=row_counter, column=0, pady=10)
                     
-                elif media_file.lower().endswith('.mp4'):
+                    # Earlier rows are visible first, so decode them first
+                    self.image_loader.request(
+                        media_path, max_size,
+                        lambda img, error, label=media_label, f=media_file: self._show_decoded_image(label, f, img, error),
+                        priority=row_counter if priority is None else priority, record=record)
+                    
+                elif record['type'] == 'video' and cv2 is not None:
+                    # Played right in the form (VLC on double-click, for sound)
+                    player = InlineVideoPlayer(self, parent, media_path, record)
+                    player.frame.grid(row=row_counter, column=0, pady=10)
+                    
+                elif record['type'] == 'video':
                     # Video placeholder
-                    media_label = tk.Label(self.scrollable_frame, 
+                    media_label = tk.Label(parent, 
                                         text=f"Video: {media_file} (double-click to play)",
                                         fg="blue", cursor="hand2")
                     media_label.bind("<Double-Button-1>", lambda e, f=media_path: self.play_video(f))
                     media_label.grid(row=row_counter, column=0, pady=10)
                     
-                elif media_file.lower().endswith('.mp3'):
-                    # Audio placeholder
-                    media_label = tk.Label(self.scrollable_frame, 
+                elif record['type'] == 'audio':
+                    # Audio link with pause/stop buttons and a position slider for seeking
+                    audio_frame = tk.Frame(parent)
+                    audio_frame.grid(row=row_counter, column=0, pady=10)
+                    media_label = tk.Label(audio_frame, 
                                         text=f"Audio: {media_file} (click to play)",
                                         fg="blue", cursor="hand2")
                     media_label.bind("<Button-1>", lambda e, f=media_path: self.play_audio(f))
-                    media_label.grid(row=row_counter, column=0, pady=10)
+                    media_label.pack(side="left")
+                    tk.Button(audio_frame, text="Pause", command=self.audio.toggle_pause).pack(side="left", padx=(10, 0))
+                    tk.Button(audio_frame, text="Stop", command=self.stop_media).pack(side="left", padx=(5, 0))
+                    duration = record.get('duration') or self.audio.duration(media_path)
+                    if duration:
+                        scale = tk.Scale(audio_frame, from_=0, to=duration, orient="horizontal", showvalue=False,
+                                         resolution=0.5, length=160)
+                        scale.bind("<ButtonRelease-1>",
+                                   lambda e, f=media_path, s=scale: self._seek_audio(f, s.get()))
+                        scale.pack(side="left", padx=(10, 0))
+                        self.audio_scales[media_path] = scale
             except Exception as e:
-                error_label = tk.Label(self.scrollable_frame, 
+                error_label = tk.Label(parent, 
                                     text=f"Error loading media: {media_file}\n{str(e)}",
                                     fg="red")
                 error_label.grid(row=row_counter, column=0, pady=10)
         else:
-            error_label = tk.Label(self.scrollable_frame, 
+            error_label = tk.Label(parent, 
                                 text=f"Media file not found: {media_file}",
                                 fg="red")
             error_label.grid(row=row_counter, column=0, pady=10)
     
+    def _show_decoded_image(self, media_label, media_file, img, error):
+        """Swap a placeholder for its decoded image (runs on the Tk thread)"""
+        if not media_label.winfo_exists():
+            return  # The row was scrolled away before the image finished decoding
+        if error is not None:
+            media_label.config(image="", text=f"Error loading media: {media_file}\n{str(error)}", fg="red")
+            media_label.image = None
+            return
+        photo = ImageTk.PhotoImage(img)
+        media_label.config(image=photo, text="")
+        media_label.image = photo  # Keep reference
+    
+    def vlc_path(self):
+        """Path of the bundled VLC executable for this OS"""
+        if platform.system() == 'Windows':
+            return os.path.join(self.vlc_folder, 'VLCPortable.exe')
+        elif platform.system() == 'Darwin':  # macOS
+            return os.path.join(self.vlc_folder, 'VLC.app', 'Contents', 'MacOS', 'VLC')
+        else:  # Linux
+            return os.path.join(self.vlc_folder, 'vlc')
+    
     def play_video(self, video_path):
-        """Play video using portable VLC player"""
+        """Play video in the shared VLC player"""
         try:
             # Stop any currently playing media
             self.stop_media()
             
-            # Determine VLC executable path based on OS
-            if platform.system() == 'Windows':
-                vlc_path = os.path.join(self.vlc_folder, 'VLCPortable.exe')
-            elif platform.system() == 'Darwin':  # macOS
-                vlc_path = os.path.join(self.vlc_folder, 'VLC.app', 'Contents', 'MacOS', 'VLC')
-            else:  # Linux
-                vlc_path = os.path.join(self.vlc_folder, 'vlc')
-            
-            if not os.path.exists(vlc_path):
+            if not os.path.exists(self.vlc_path()):
                 messagebox.showerror("Error", "VLC player not found in the VLCPortable folder")
                 return
             
-            # Launch VLC with the video file
-            subprocess.Popen([vlc_path, video_path])
+            self.vlc.play(video_path)
+            self.currently_playing = video_path
             
         except Exception as e:
             messagebox.showerror("Playback Error", f"Could not play video: {str(e)}")
 
     def play_audio(self, audio_path):
-        """Play audio using portable VLC player"""
+        """Play audio in-process through pygame.mixer"""
         try:
-            # Stop any currently playing audio
+            # Stop any currently playing media
             self.stop_media()
-            
-            # Determine VLC executable path based on OS
-            if platform.system() == 'Windows':
-                vlc_path = os.path.join(self.vlc_folder, 'VLCPortable.exe')
-            elif platform.system() == 'Darwin':  # macOS
-                vlc_path = os.path.join(self.vlc_folder, 'VLC.app', 'Contents', 'MacOS', 'VLC')
-            else:  # Linux
-                vlc_path = os.path.join(self.vlc_folder, 'vlc')
-            
-            if not os.path.exists(vlc_path):
-                messagebox.showerror("Error", "VLC player not found in the VLCPortable folder")
-                return
-            
-            # Launch VLC with the audio file
-            subprocess.Popen([vlc_path, audio_path])
-            
-        except Exception as e:
+            self.audio.play(audio_path)
+            self.currently_playing = audio_path
+            self._update_audio_position()
+        except pygame.error as e:
+            messagebox.showerror("Playback Error", f"Could not play audio: {str(e)}")
+    
+    def _seek_audio(self, audio_path, seconds):
+        """Jump to a slider position, starting the item there if it isn't the one playing"""
+        try:
+            if self.audio.current == audio_path:
+                self.audio.seek(seconds)
+            else:
+                self.stop_media()
+                self.audio.play(audio_path, start=seconds)
+                self.currently_playing = audio_path
+                self._update_audio_position()
+        except pygame.error as e:
             messagebox.showerror("Playback Error", f"Could not play audio: {str(e)}")
+    
+    def _update_audio_position(self):
+        """Move the playing item's slider along while it plays (one update loop at a time)"""
+        if self.audio_update is not None:
+            self.root.after_cancel(self.audio_update)
+            self.audio_update = None
+        for path, scale in self.audio_scales.items():
+            if scale.winfo_exists():
+                scale.set(self.audio.position() if path == self.audio.current else 0)
+        if self.audio.is_active():
+            self.audio_update = self.root.after(250, self._update_audio_position)
             
     def stop_media(self):
-        """Stop any currently playing media (just cleanup references)"""
+        """Stop any currently playing media"""
+        self.audio.stop()
+        self.vlc.stop()
+        if self.inline_video is not None:
+            self.inline_video.stop()
+        if self.audio_update is not None:
+            self._update_audio_position()  # Resets the sliders
         self.currently_playing = None
         if hasattr(self, 'media_window') and self.media_window and tk.Toplevel.winfo_exists(self.media_window):
             self.media_window.destroy()    
 
     def on_window_resize(self, event):
-        if event.widget == self.root:
+        if event.widget == self.root and not self.virtualized:
             # Simply update the scrollregion
             self.canvas.configure(scrollregion=self.canvas.bbox("all"))
 
     def update_scrollregion(self):
+        if self.virtualized:
+            return  # The virtualized scrollregion is computed from row heights
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
     
+    def compile_validator(self, modifiers):
+        """Turn a question's modifiers into one validate(response) -> (is_valid, error_msg) function
+        
+        All modifier checks and regex compilation happen here, once, so submitting
+        only runs the precompiled checks for each field.
+        """
+        checks = []
+        for modifier in modifiers:
+            name, _, value = modifier.partition('=')
+            if name == 'integer':
+                checks.append((INTEGER_PATTERN.fullmatch, True, "Please enter a valid integer"))
+            elif name == 'number':
+                checks.append((NUMBER_PATTERN.fullmatch, True, "Please enter a valid number"))
+            elif name == 'text':
+                checks.append((DIGIT_PATTERN.search, False, "This field should contain only text"))
+            elif name == 'regex':
+                checks.append((re.compile(value).fullmatch, True, f"Please enter a value matching {value}"))
+            elif name == 'range':
+                low, high = parse_range(value)
+                def in_range(text, low=low, high=high):
+                    if not NUMBER_PATTERN.fullmatch(text):
+                        return False
+                    return (low is None or float(text) >= low) and (high is None or float(text) <= high)
+                if high is None:
+                    error_msg = f"Please enter a number of at least {low:g}"
+                elif low is None:
+                    error_msg = f"Please enter a number of at most {high:g}"
+                else:
+                    error_msg = f"Please enter a number between {low:g} and {high:g}"
+                checks.append((in_range, True, error_msg))
+            elif name == 'lookup':
+                def in_lookup(text, name=value):
+                    index = self.lookups.get(name)
+                    return index is None or index.contains(text)
+                checks.append((in_lookup, True, f"Please choose one of the values listed in {value}"))
+        required = 'required' in modifiers
+        
+        def validate(response):
+            response = response.strip()
+            if not response:
+                # Skip validation for empty non-required fields
+                return (False, "This field is required") if required else (True, "")
+            for check, should_match, error_msg in checks:
+                if bool(check(response)) != should_match:
+                    return False, error_msg
+            return True, ""
+        return validate
+    
     def validate_response(self, response, modifiers, question):
         """Validate the response based on modifiers"""
-        if not response.strip() and 'required' in modifiers:
-            return False, "This field is required"
-            
-        if not response.strip():  # Skip validation for empty non-required fields
-            return True, ""
-            
-        if 'integer' in modifiers:
-            if not response.strip().isdigit():
-                return False, "Please enter a valid integer"
-                
-        if 'number' in modifiers:
-            try:
-                float(response.strip())
-            except ValueError:
-                return False, "Please enter a valid number"
-                
-        if 'text' in modifiers:
-            if any(char.isdigit() for char in response.strip()):
-                return False, "This field should contain only text"
-                
-        return True, ""
+        return self.compile_validator(modifiers)(response)
     
-    def submit_form(self):
-        # Collect responses
-        responses = []
-        empty_fields = []
+    def read_answers(self):
+        """Return the current answer to every question as text, in question order"""
+        if self.virtualized:
+            self._sync_live_rows_out()
+            return [str(answer) for answer in self.answers]
         
-        # Initialize indices for checkboxes and entries
+        answers = []
         checkbox_index = 0
-        entry_index = 0
-        
-        for i, (question, modifiers) in enumerate(zip(self.questions, self.question_modifiers)):
+        for entry, modifiers in zip(self.entries, self.question_modifiers):
             if 'checkmark' in modifiers:
                 # Handle checkbox
-                response = str(self.checkbox_vars[checkbox_index].get())
+                answers.append(str(self.checkbox_vars[checkbox_index].get()))
                 checkbox_index += 1
+            elif isinstance(entry, Text):
+                answers.append(entry.get("1.0", "end-1c"))
+            elif entry is not None:  # Regular entry
+                answers.append(entry.get())
             else:
-                # Handle text entry
-                if entry_index < len(self.entries):
-                    entry = self.entries[entry_index]
-                    if isinstance(entry, Text):
-                        response = entry.get("1.0", "end-1c")
-                    elif entry is not None:  # Regular entry
-                        response = entry.get()
-                    else:
-                        response = ""
-                    entry_index += 1
-                else:
-                    response = ""
-            
+                answers.append("")
+        return answers
+    
+    def submit_form(self):
+        # Collect responses
+        responses = []
+        empty_fields = []
+        answers = self.read_answers()
+        
+        # <lookup=...> answers can only be checked once their list has loaded
+        for modifiers, response in zip(self.question_modifiers, answers):
+            index = self.lookups.get(lookup_source(modifiers))
+            if index is not None and response.strip() and not index.ready.is_set():
+                messagebox.showinfo("Please Wait", f"The list {lookup_source(modifiers)} is still loading. "
+                                                   "Please submit again in a moment.")
+                return
+        
+        for question, modifiers, validate, response in zip(self.questions, self.question_modifiers,
+                                                           self.validators, answers):
             # Check for empty fields (for warning)
             if not response.strip() and 'required' not in modifiers:
                 empty_fields.append(question)
             
             # Validate response
-            is_valid, error_msg = self.validate_response(response, modifiers, question)
+            is_valid, error_msg = validate(response)
             if not is_valid:
                 messagebox.showerror("Validation Error", f"Question: {question}\nError: {error_msg}")
                 return
             
             responses.append(response)
+        
+        # Answers to <unique> questions must not have been given before
+        unique_answers = self._unique_answers(responses)
+        if unique_answers and self.unique_index is None and not self.unique_index_failed:
+            messagebox.showinfo("Please Wait", "Earlier responses are still being checked for duplicates. "
+                                               "Please submit again in a moment.")
+            return
+        if unique_answers and self.unique_index is not None:
+            for question, response in unique_answers:
+                if self.unique_index.contains(question, response):
+                    messagebox.showerror("Validation Error",
+                                         f"Question: {question}\nError: This answer has already been submitted")
+                    return
     
         # Check if any required fields are empty
         for i, (response, modifiers, question) in enumerate(zip(responses, self.question_modifiers, self.questions)):
@@ -522,75 +4149,247 @@ Do you agree to the terms?<checkmark>"""
         
         # Check for remote link
         remote_link = self.load_remote_link()
+        
+        # The answers are captured, so clear the form for the next person while this one saves
+        if unique_answers and self.unique_index is not None:
+            self.unique_index.claim(unique_answers)
+        self.clear_form()
+        self._queue_save(lambda: self._save_responses(responses, data, remote_link), responses)
+    
+    def _queue_save(self, job, responses):
+        """Run a save job on the save worker and show it as in progress"""
+        self.pending_saves += 1
+        self.status_label.config(text=f"Saving... ({self.pending_saves} pending)")
+        self.save_worker.run(job, lambda result, error: self._on_save_finished(result, error, responses))
+    
+    def _refresh_outbox_status(self):
+        """Show how many web submissions are still waiting to upload, refreshed every second"""
+        if self.outbox.depth or self.outbox.rejected:
+            text = f"{self.outbox.depth} waiting to upload"
+            if self.outbox.rejected:
+                text += f", {self.outbox.rejected} rejected by server"
+            if self.outbox.breaker.state == 'open':
+                retry_at = datetime.fromtimestamp(time.time() + self.outbox.breaker.seconds_until_retry())
+                text += f" (server unreachable, next try {retry_at.strftime('%H:%M:%S')})"
+            elif self.outbox.last_error:
+                text += f" (last error: {self.outbox.last_error[:60]})"
+        else:
+            text = ""
+        self.outbox_label.config(text=text)
+        self.root.after(1000, self._refresh_outbox_status)
+    
+    def _save_responses(self, responses, data, remote_link):
+        """Save one submission (runs on the save worker, so it must not touch Tk)"""
         if remote_link:
             # Try to save to remote location or local path
             success, message = self.save_to_remote(data, remote_link)
-            if success:
-                messagebox.showinfo("Success", message)
-            else:
-                # Fall back to local saving if remote fails
-                if messagebox.askyesno("Save Failed", 
-                                    f"{message}\n\nWould you like to save to default location instead?"):
-                    self.save_to_local(responses)
+            self._record_unique(responses, success)
+            return success, message, True
+        # Save locally if no remote link
+        success, message = self.save_to_local(responses)
+        self._record_unique(responses, success)
+        return success, message, False
+    
+    def _save_locally_instead(self, responses):
+        """Save a submission locally after its remote save failed (runs on the save worker)"""
+        success, message = self.save_to_local(responses)
+        self._record_unique(responses, success)
+        return success, message, False
+    
+    def _on_save_finished(self, result, error, responses):
+        """Report how a save went, giving the answers back to the form if it failed (runs on the Tk thread)"""
+        self.pending_saves -= 1
+        if error is not None:
+            result = (False, f"Failed to save: {str(error)}", False)
+        success, message, remote = result
+        
+        if self.pending_saves:
+            self.status_label.config(text=f"Saving... ({self.pending_saves} pending)")
+        elif success:
+            self.status_label.config(text=f"{message} ({datetime.now().strftime('%H:%M:%S')})")
         else:
-            # Save locally if no remote link
-            self.save_to_local(responses)
+            self.status_label.config(text="")
+        
+        if success:
+            return
+        if remote:
+            # Fall back to local saving if remote fails
+            if messagebox.askyesno("Save Failed", 
+                                f"{message}\n\nWould you like to save to default location instead?"):
+                self._queue_save(lambda: self._save_locally_instead(responses), responses)
+                return
+        else:
+            messagebox.showerror("Error", message)
+        self.restore_answers(responses[:-1])
+    
+    def restore_answers(self, answers):
+        """Put the answers of a submission that couldn't be saved back in the form so it can be retried"""
+        current = self.read_answers()
+        if any(answer.strip() and answer != "False" for answer in current) and not messagebox.askyesno(
+                "Save Failed", "Someone has started filling in the form again.\n\n"
+                               "Replace what they have entered with the answers that couldn't be saved?"):
+            return
+        if self.virtualized:
+            self.answers = [answer == "True" if 'checkmark' in modifiers else answer
+                            for answer, modifiers in zip(answers, self.question_modifiers)]
+            for live in self.live_rows.values():
+                if live.kind != 'media':
+                    live.load(live.question_index, self.questions[live.question_index],
+                              self.answers[live.question_index])
+            return
+        
+        checkbox_index = 0
+        for i, (entry, answer) in enumerate(zip(self.entries, answers)):
+            if 'checkmark' in self.question_modifiers[i]:
+                self.checkbox_vars[checkbox_index].set(answer == "True")
+                checkbox_index += 1
+            elif entry is not None:
+                if isinstance(entry, Text):
+                    entry.delete("1.0", tk.END)
+                    entry.insert("1.0", answer)
+                else:
+                    entry.delete(0, tk.END)
+                    entry.insert(0, answer)
             
+    def load_lookups(self):
+        """Start loading the reference list of every <lookup=...> question in the background"""
+        names = {lookup_source(modifiers) for modifiers in self.question_modifiers} - {None}
+        if not names:
+            return
+        worker = BackgroundWorker(self.root)
+        for name in sorted(names):
+            index = self.lookups[name] = LookupIndex(os.path.join(self.data_folder, name))
+            def on_done(count, error, name=name):
+                if error is not None:
+                    del self.lookups[name]  # Suggestions and checks are skipped rather than blocking submits
+                    messagebox.showwarning("Warning", f"Could not load the lookup list {name}: {str(error)}")
+            worker.run(index.load, on_done)
+    
+    def _on_stats_ready(self, rows, error):
+        if error is not None:
+            print(f"Could not load response statistics: {error}")
+        self.stats_ready = True
+    
+    def open_dashboard(self, event=None):
+        """Show the live statistics window, or raise it if it is already open"""
+        if event is not None and isinstance(self.root.focus_get(), (tk.Entry, tk.Text)):
+            return  # Someone is typing an answer
+        if not self.stats_ready:
+            messagebox.showinfo("Please Wait", "The statistics are still being loaded. Please try again in a moment.")
+            return
+        if self.dashboard is not None and not self.dashboard.closed:
+            self.dashboard.window.lift()
+            return
+        if self.dashboard_worker is None:
+            self.dashboard_worker = BackgroundWorker(self.root)
+        self.dashboard = StatsDashboard(self, self.dashboard_worker)
+    
+    def _open_unique_index(self, unique_questions):
+        """Open the <unique> answer index, indexing earlier responses to questions it doesn't cover yet"""
+        os.makedirs(self.cache_folder, exist_ok=True)
+        index = UniqueIndex(os.path.join(self.cache_folder, "Unique_Index.sqlite3"))
+        missing = set(unique_questions) - index.indexed_questions()
+        if missing:
+            index.rebuild(self._saved_responses(), missing)
+            index.mark_indexed(missing)
+        return index
+    
+    def _on_unique_index_ready(self, index, error):
+        if error is not None:
+            # Saving must never wait on an index that will not come
+            self.unique_index_failed = True
+            messagebox.showwarning("Warning", f"Could not check earlier responses for duplicates: {str(error)}\n"
+                                              "Responses will be saved without checking <unique> answers.")
+            return
+        self.unique_index = index
+    
+    def _saved_responses(self):
+        """Yield (questions, answers) for every response saved locally, oldest first"""
+        if isinstance(self.response_store, SqliteResponseStore):
+            last_id = 0
+            while True:
+                rows = self.response_store.rows_after(last_id)
+                if not rows:
+                    return
+                for last_id, questions, answers, _ in rows:
+                    yield questions, answers
+        archive = ResponseArchive(self.csv_file)
+        for path in archive.files():
+            with open_response_file(path) as file:
+                for questions_id, answers, _ in read_response_rows(file, archive.registry):
+                    yield archive.registry.schemas.get(questions_id, []), answers
+    
+    def _unique_answers(self, responses):
+        """(question, answer) for each non-blank answer to a <unique> question"""
+        return [(question, response) for question, modifiers, response
+                in zip(self.questions, self.question_modifiers, responses)
+                if 'unique' in modifiers and response.strip()]
+    
+    def _record_unique(self, responses, saved):
+        """Add saved <unique> answers to the index, or free them for reuse if the save failed"""
+        pairs = self._unique_answers(responses)
+        if pairs and self.unique_index is not None:
+            if saved:
+                self.unique_index.add(pairs)
+            else:
+                self.unique_index.release(pairs)
+    
+    def _stats_settings(self):
+        """ResponseStats kinds and starting histogram widths for the questions on the form"""
+        kinds, widths = {}, {}
+        for question, modifiers in zip(self.questions, self.question_modifiers):
+            kinds[question] = stats_kind(modifiers)
+            for modifier in modifiers:
+                if modifier.startswith('range='):
+                    low, high = parse_range(modifier[len('range='):])
+                    if low is not None and high is not None and high > low:
+                        widths[question] = (high - low) / STATS_HISTOGRAM_BINS
+        return {"kinds": kinds, "widths": widths}
+    
     def save_to_local(self, responses):
-        """Save responses to local CSV file"""
+        """Save responses to local CSV file, returning (success, message)"""
         try:
-            file_exists = os.path.isfile(self.csv_file)
-            with open(self.csv_file, 'a', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                if not file_exists:
-                    header_questions = self.questions.copy()
-                    header_questions.append("Timestamp")
-                    writer.writerow(header_questions)
-                
-                writer.writerow(responses)
-                
-            messagebox.showinfo("Success", "Your responses have been saved locally!")
+            header_questions = self.questions.copy()
+            header_questions.append("Timestamp")
+            position = self.response_store.append(header_questions, responses)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to save responses locally: {str(e)}")
+            return False, f"Failed to save responses locally: {str(e)}"
+        # The row is saved by now, so a problem with the statistics mustn't report the save as failed
+        try:
+            self.stats.add(self.questions, responses[:-1], position)
+        except Exception as e:
+            print(f"Could not update response statistics: {str(e)}")
+        return True, "Your responses have been saved locally!"
     
     def save_to_remote(self, data, remote_link):
         """Attempt to save data to a remote location (either web URL or local path)"""
         try:
             if self.is_web_url(remote_link):
-                # Handle web URL
-                response = requests.post(remote_link, json=data)
-                if response.status_code == 200:
-                    return True, "Data saved remotely successfully!"
-                else:
-                    return False, f"Remote server returned status code {response.status_code}"
+                # Web submissions are written to the outbox first and uploaded in the background
+                self.outbox.add(remote_link, data)
+                return True, "Your responses have been saved and queued for upload!"
             else:
                 # Handle local path
                 try:
                     # Check if the path is a directory
                     if os.path.isdir(remote_link):
-                        # Use a consistent filename in the directory
-                        filename = "Responses.csv"
-                        full_path = os.path.join(remote_link, filename)
+                        # Every kiosk appends to its own shard, so writers sharing a directory never
+                        # interleave rows; the merge command combines the shards
+                        full_path = os.path.join(remote_link, self.shard_name)
                     else:
                         # Use the path as is (assuming it includes a filename)
                         full_path = remote_link
                         # Ensure directory exists
                         os.makedirs(os.path.dirname(full_path), exist_ok=True)
                     
-                    # Prepare CSV data
-                    file_exists = os.path.isfile(full_path)
-                    with open(full_path, 'a', newline='') as csvfile:
-                        writer = csv.writer(csvfile)
-                        
-                        if not file_exists:
-                            header_questions = data['questions'].copy()
-                            header_questions.append("Timestamp")
-                            writer.writerow(header_questions)
-                        
-                        row = data['responses'].copy()
-                        row.append(data['timestamp'])
-                        writer.writerow(row)
+                    if full_path not in self.remote_stores:
+                        self.remote_stores[full_path] = CsvResponseStore(full_path)
+                    
+                    header_questions = data['questions'].copy()
+                    header_questions.append("Timestamp")
+                    row = data['responses'].copy()
+                    row.append(data['timestamp'])
+                    self.remote_stores[full_path].append(header_questions, row)
                     
                     return True, f"Data saved to local path: {full_path}"
                 except Exception as e:
@@ -598,8 +4397,40 @@ Do you agree to the terms?<checkmark>"""
         except Exception as e:
             return False, f"Failed to save: {str(e)}"
         
+    def on_close(self):
+        """Close the window, checking first that no responses are still being saved"""
+        if self.pending_saves and not messagebox.askyesno(
+                "Still Saving",
+                f"{self.pending_saves} response(s) are still being saved.\n\n"
+                "Close anyway? (Saves already under way get up to 10 seconds to finish.)"):
+            return
+        self.stop_media()
+        self.vlc.shutdown()
+        if self.video_previews is not None:
+            self.video_previews.shutdown()
+        # Let saves already handed to the save worker finish before closing what they write to
+        if self.save_worker.drain(timeout=10):
+            self.response_store.close()
+            self.stats.save()
+            if self.unique_index is not None:
+                self.unique_index.close()
+            for store in self.remote_stores.values():
+                store.close()
+        else:
+            print("A save was still running at close; its files are left for the operating system to close")
+        self.outbox.close()
+        self.root.destroy()
+    
     def clear_form(self):
         """Clear all form entries"""
+        if self.virtualized:
+            self.answers = [False if 'checkmark' in modifiers else "" for modifiers in self.question_modifiers]
+            for live in self.live_rows.values():
+                if live.kind != 'media':
+                    live.load(live.question_index, self.questions[live.question_index],
+                              self.answers[live.question_index])
+            return
+        
         checkbox_index = 0
         for i, entry in enumerate(self.entries):
             if 'checkmark' in self.question_modifiers[i]:
@@ -611,6 +4442,102 @@ Do you agree to the terms?<checkmark>"""
                 else:
                     entry.delete(0, tk.END)
 
+def run_command(data_folder, args):
+    """Command line tools for the response files, e.g. `Internal_Form_Generator.py export out.csv`"""
+    parser = argparse.ArgumentParser(description="Tools for the responses saved by the form")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = commands.add_parser("export", help="Stream the responses in Responses.sqlite3 to a CSV file")
+    export_parser.add_argument("output", help="CSV file to write")
+    export_parser.add_argument("--schema", help="Only export responses to this question list ID (default: all of them)")
+    
+    import_parser = commands.add_parser("import-csv", help="Bulk load a responses CSV into Responses.sqlite3")
+    import_parser.add_argument("csv", nargs="?", default=os.path.join(data_folder, "Responses.csv"),
+                               help="CSV file to import, along with its archived segments "
+                                    "(default: Change_Form/Responses.csv)")
+    
+    merge_parser = commands.add_parser("merge", help="Merge the per-kiosk Responses-*.csv shards in a shared directory")
+    merge_parser.add_argument("directory", help="Shared directory named in Remote_Link.txt")
+    merge_parser.add_argument("output", help="CSV file to write")
+    
+    query_parser = commands.add_parser("query", help="Write the responses saved between two times to a CSV file")
+    query_parser.add_argument("start", help='Earliest time, e.g. "2024-05-01 13:00" or "2024-05-01"')
+    query_parser.add_argument("end", nargs="?", help='Latest time, inclusive; a date or partial time covers all of it')
+    query_parser.add_argument("-o", "--output", help="CSV file to write (default: print the rows)")
+    query_parser.add_argument("--csv", default=os.path.join(data_folder, "Responses.csv"),
+                              help="Responses file to search (default: Change_Form/Responses.csv)")
+    
+    stats_parser = commands.add_parser("stats", help="Summarise the answers to every question")
+    stats_parser.add_argument("--sqlite", action="store_true",
+                              help="Read Responses.sqlite3 (storage_backend \"sqlite\") instead of Responses.csv")
+    stats_parser.add_argument("--rebuild", action="store_true",
+                              help="Recompute from all saved responses instead of using the saved snapshot")
+    
+    args = parser.parse_args(args)
+    if args.command == "stats":
+        if args.sqlite:
+            stats = ResponseStats(os.path.join(os.path.dirname(data_folder), "Cache", "Response_Stats.json"),
+                                  sqlite_path=os.path.join(data_folder, "Responses.sqlite3"))
+        else:
+            stats = ResponseStats(os.path.join(os.path.dirname(data_folder), "Cache", "Response_Stats.json"),
+                                  os.path.join(data_folder, "Responses.csv"))
+        try:
+            rows = stats.rebuild() if args.rebuild else stats.catch_up()
+        except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+            parser.error(str(e))
+        print(f"{rows} responses")
+        for question, question_stats in stats.questions.items():
+            print(f"{question}: {question_stats.describe()}")
+        return
+    
+    if args.command == "query":
+        archive = ResponseArchive(args.csv)
+        try:
+            results = query_responses(args.csv, args.start, args.end, archive)
+            # Reading the first row registers the question list of the file's header too
+            first = next(results, None)
+            column_map = ColumnMap(archive.registry.schemas)
+            output = open(args.output, 'w', newline='') if args.output else sys.stdout
+            try:
+                writer = csv.writer(output)
+                writer.writerow(column_map.columns + ["Timestamp", CsvResponseStore.SCHEMA_COLUMN])
+                count = 0
+                for questions_id, answers, timestamp in itertools.chain([first] if first else [], results):
+                    writer.writerow(column_map.row(questions_id, answers) + [timestamp, questions_id])
+                    count += 1
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(f"Found {count} responses", file=sys.stderr)
+        return
+    
+    if args.command == "merge":
+        shards = sorted(glob.glob(os.path.join(args.directory, "Responses-*.csv")))
+        try:
+            with open(args.output, 'w', newline='') as output:
+                count = merge_response_files(shards, output,
+                                             SchemaRegistry(os.path.join(args.directory, "Schemas.jsonl")))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(f"Merged {count} responses from {len(shards)} shards into {args.output}")
+        return
+    
+    store = SqliteResponseStore(os.path.join(data_folder, "Responses.sqlite3"))
+    try:
+        if args.command == "export":
+            with open(args.output, 'w', newline='') as output:
+                count = store.export_csv(output, args.schema)
+            print(f"Exported {count} responses to {args.output}")
+        elif args.command == "import-csv":
+            count = store.import_csv(args.csv)
+            print(f"Imported {count} responses from {args.csv}")
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    finally:
+        store.close()
+
 def main():
     # Configuration - just filenames without paths
     questions_file = "Questions.txt"
@@ -618,11 +4545,29 @@ def main():
     description_file = "Description.txt"
     window_width = 800
     window_height = 600
+    remote_timeout = (5, 30)  # Seconds to connect to / wait on a web link before giving up
+    upload_batch_size = 1  # Above 1, queued responses are sent to a web link in gzip batches (the server must accept them)
+    csv_commit_rows = 10  # Responses are forced to disk after this many rows...
+    csv_commit_interval = 1.0  # ...or this many seconds, whichever comes first
+    storage_backend = "csv"  # "csv" for Responses.csv, or "sqlite" for Responses.sqlite3
+    csv_rotate_bytes = 0  # Start a new Responses.csv segment at this size (0 = never)...
+    csv_rotate_daily = False  # ...and/or on the first response of each day
+    archive_compression = "gzip"  # Compress old segments with "gzip" (faster) or "lzma" (smaller)
+    
+    # Any arguments run one of the command line tools instead of opening the form
+    if len(sys.argv) > 1:
+        run_command(os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "Change_Form"), sys.argv[1:])
+        return
     
     # Create Tkinter window
     root = tk.Tk()
-    app = FormApplication(root, questions_file, csv_file, description_file, window_width, window_height)
+    app = FormApplication(root, questions_file, csv_file, description_file, window_width, window_height,
+                          remote_timeout=remote_timeout, upload_batch_size=upload_batch_size,
+                          csv_commit_rows=csv_commit_rows, csv_commit_interval=csv_commit_interval,
+                          storage_backend=storage_backend, csv_rotate_bytes=csv_rotate_bytes,
+                          csv_rotate_daily=csv_rotate_daily, archive_compression=archive_compression)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    multiprocessing.freeze_support()  # Video preview worker processes start here in the bundled app
+    main()